@@ -0,0 +1,100 @@
+"""
+Сколько стоит найти хендлер для callback-кнопки.
+
+    python -m benchmarks.callback_dispatch
+
+before — как было: цепочка F.data.startswith(...) / F.data == ... в
+порядке регистрации хендлеров, потом split(":") в самом хендлере.
+after — CallbackRouter: поиск по префиксу + разбор в CallbackData.
+"""
+
+import inspect
+import timeit
+
+from aiogram import F
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, User
+
+from keyboards import callbacks as cb
+from utils.callback_router import CallbackRouter
+
+NUMBER = 20_000
+
+# фильтры старых хендлеров admin + manage_post в порядке регистрации
+LEGACY_FILTERS = [
+    F.data.startswith("target_toggle:"),
+    F.data == "target_done",
+    F.data == "post_action:cancel",
+    F.data == "post_action:now",
+    F.data == "post_action:repeat",
+    F.data.startswith("repeat:"),
+    F.data == "post_action:schedule",
+    F.data.startswith("pick_date:"),
+    F.data == "open_calendar",
+    F.data.startswith("calendar_prev:"),
+    F.data.startswith("calendar_next:"),
+    F.data == "calendar_close",
+    F.data.startswith("calendar_pick:"),
+    F.data.startswith("posts_page:"),
+    F.data == "failed_requeue",
+    F.data.startswith("overdue:"),
+    F.data.startswith("post_open:"),
+    F.data.startswith("edit_text:"),
+    F.data.startswith("edit_media:"),
+    F.data.startswith("edit_date:"),
+    F.data.startswith("edit_time:"),
+    F.data.startswith("delete_post:"),
+    F.data == "back_to_list",
+]
+
+# одна и та же кнопка в старом и новом формате
+CASES = {
+    "first (target_toggle)": ("target_toggle:1", cb.TargetToggle(index=1)),
+    "middle (calendar_next)": (
+        "calendar_next:2026:11",
+        cb.CalendarMonth(year=2026, month=12),
+    ),
+    "last (back_to_list)": ("back_to_list", cb.BackToList()),
+    "deep (delete_post)": ("delete_post:42:3", cb.DeletePost(id=42, version=3)),
+}
+
+
+def _callback(data: str) -> CallbackQuery:
+    user = User(id=1, is_bot=False, first_name="admin")
+    return CallbackQuery(id="1", from_user=user, chat_instance="1", data=data)
+
+
+def legacy_dispatch(callback: CallbackQuery):
+    for index, flt in enumerate(LEGACY_FILTERS):
+        if flt.resolve(callback):
+            return index, callback.data.split(":")
+    return None
+
+
+def build_router() -> CallbackRouter:
+    router = CallbackRouter()
+    for data_cls in vars(cb).values():
+        if inspect.isclass(data_cls) and issubclass(data_cls, CallbackData):
+            if data_cls is not CallbackData:
+                router.register(lambda callback: None, data_cls)
+    return router
+
+
+def main():
+    router = build_router()
+    print(f"{'callback':<26}{'before, us':>12}{'after, us':>12}")
+    for name, (legacy_data, data) in CASES.items():
+        legacy = _callback(legacy_data)
+        packed = data.pack()
+        assert legacy_dispatch(legacy) is not None
+        assert router.resolve(packed) is not None
+
+        before = timeit.timeit(lambda: legacy_dispatch(legacy), number=NUMBER)
+        after = timeit.timeit(lambda: router.resolve(packed), number=NUMBER)
+        print(
+            f"{name:<26}{before / NUMBER * 1e6:>12.2f}{after / NUMBER * 1e6:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
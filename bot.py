@@ -1,20 +1,20 @@
 import asyncio
 from aiogram import Bot, Dispatcher
-from config import BOT_TOKEN
+from config import BOT_TOKEN, RUN_MODE
 
 from handlers.start import register_start_handlers
 from handlers.user import register_user_handlers
-from handlers.admin import register_admin_handlers
+from handlers.admin import register_admin_handlers, notify_overdue
 
-from utils.scheduler import scheduler, schedule_post
-from utils.db import init_db, get_all_pending_posts
+from utils.scheduler import scheduler, start_scheduler, shutdown_scheduler
+from utils.db import init_db, close_db
+from utils.fsm_storage import SQLiteStorage
+from utils.post_index import load_post_index
+from utils.webhook import run_webhook
 
-from datetime import datetime
-import pytz
 from handlers.manage_post import register_manage_post_handlers
-
-
-LA = pytz.timezone("America/New_York")
+from keyboards.calendar_kb import precompute_calendars
+from middlewares.admin import AdminGateMiddleware
 
 
 async def main():
@@ -23,27 +23,51 @@ async def main():
 
     bot = Bot(token=BOT_TOKEN)
 
-    dp = Dispatcher()
-
-    await init_db()  # создаём таблицы
-
-    # Запускаем планировщик
-    scheduler.start()
-
-    # ВАЖНО: при рестарте подгружаем все незавершённые задачи
-    pending_posts = await get_all_pending_posts()
-    for post in pending_posts:
-        publish_dt = datetime.fromisoformat(post["publish_time"])
-        schedule_post(bot, post["id"], publish_dt)
-
-    # Регистрируем хендлеры
-    register_start_handlers(dp)
-    register_admin_handlers(dp)  # ← admin должен быть раньше user!
-    register_manage_post_handlers(dp)
-    register_user_handlers(dp)
-
-    print("Bot is running...")
-    await dp.start_polling(bot)
+    # FSM хранится в той же SQLite-базе — диалоги переживают рестарт
+    storage = SQLiteStorage()
+    # FSM подключается через AdminGateMiddleware — состояние читается
+    # только для админов, остальные до хранилища не доходят
+    dp = Dispatcher(storage=storage, disable_fsm=True)
+    dp.update.outer_middleware(AdminGateMiddleware(dp.fsm))
+
+    await init_db()  # открываем пул соединений и создаём таблицы
+    await load_post_index()  # список запланированных — дальше из памяти
+
+    try:
+        # Запускаем планировщик.
+        # ВАЖНО: при рестарте подгружаем незавершённые задачи — в память
+        # попадают только ближайшие (окно), остальные дочитываются по ходу
+        await start_scheduler(bot)
+        # сетки календаря на ближайшие месяцы: сразу и заново каждую полночь
+        precompute_calendars()
+        scheduler.add_job(
+            precompute_calendars,
+            "cron",
+            hour=0,
+            minute=0,
+            id="precompute_calendars",
+            replace_existing=True,
+        )
+        # сильно просроченные за время простоя — на решение админу
+        await notify_overdue(bot)
+
+        # Регистрируем хендлеры
+        register_start_handlers(dp)
+        register_admin_handlers(dp)  # ← admin должен быть раньше user!
+        register_manage_post_handlers(dp)
+        register_user_handlers(dp)
+
+        print("Bot is running...")
+        if RUN_MODE == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            # вебхук и getUpdates несовместимы — снимаем, если остался
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await shutdown_scheduler()
+        await storage.close()
+        await close_db()
 
 
 if __name__ == "__main__":
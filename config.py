@@ -1,10 +1,104 @@
 import os
+import socket
 from dotenv import load_dotenv
 
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHANNEL_ID = os.getenv("CHANNEL_ID")
+
+
+def _parse_ids(name: str, value: str) -> frozenset[int]:
+    try:
+        return frozenset(int(item) for item in value.split(",") if item.strip())
+    except ValueError:
+        raise ValueError(
+            f"{name} must be comma-separated numeric Telegram IDs, got {value!r}"
+        ) from None
+
+
+# Telegram ID админов через запятую
+ADMIN_IDS = _parse_ids("ADMIN_IDS", os.getenv("ADMIN_IDS", "8120213148,882428172"))
 DB_PATH = os.getenv("DB_PATH", "data/posts.db")
+# сколько соединений-читателей держит пул БД (писатель всегда один)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+# планировщик держит в памяти только посты ближайших N часов
+SCHEDULER_HORIZON_HOURS = float(os.getenv("SCHEDULER_HORIZON_HOURS", "6"))
+# как часто окно планировщика дочитывается из БД
+SCHEDULER_REFILL_MINUTES = float(os.getenv("SCHEDULER_REFILL_MINUTES", "10"))
+# движок постов: apscheduler (задача на пост) или heap (один таймер на все)
+SCHEDULER_ENGINE = os.getenv("SCHEDULER_ENGINE", "apscheduler")
+# публикация: число воркеров и размер очереди
+PUBLISH_WORKERS = int(os.getenv("PUBLISH_WORKERS", "4"))
+PUBLISH_QUEUE_SIZE = int(os.getenv("PUBLISH_QUEUE_SIZE", "1000"))
+# лимиты Bot API: всего сообщений в секунду и на один чат в минуту
+TG_GLOBAL_PER_SECOND = float(os.getenv("TG_GLOBAL_PER_SECOND", "30"))
+TG_CHAT_PER_MINUTE = float(os.getenv("TG_CHAT_PER_MINUTE", "20"))
+# всплеск не меньше 10: альбом до 10 элементов должен уходить одним запросом
+TG_CHAT_BURST = max(10.0, float(os.getenv("TG_CHAT_BURST", "10")))
+# имя этого процесса в захватах постов (claimed_by) — должно быть уникальным
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+# на сколько секунд воркер захватывает пост на время публикации
+PUBLISH_LEASE_SECONDS = int(os.getenv("PUBLISH_LEASE_SECONDS", "300"))
+# повторы неудачных публикаций: попыток всего, база и потолок задержки
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", "30"))
+RETRY_MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", "1800"))
+# просрочка после простоя: до N минут догоняем, старше — по политике
+# catchup (публиковать) / expire (не публиковать) / ask (спросить админа)
+OVERDUE_CATCHUP_MINUTES = int(os.getenv("OVERDUE_CATCHUP_MINUTES", "60"))
+OVERDUE_POLICY = os.getenv("OVERDUE_POLICY", "ask")
+# пауза между догоняющими публикациями
+CATCHUP_INTERVAL_SECONDS = float(os.getenv("CATCHUP_INTERVAL_SECONDS", "3"))
+# готовые к отправке посты: размер кэша и за сколько секунд собирать заранее
+PAYLOAD_CACHE_SIZE = int(os.getenv("PAYLOAD_CACHE_SIZE", "256"))
+PAYLOAD_WARMUP_SECONDS = int(os.getenv("PAYLOAD_WARMUP_SECONDS", "60"))
+# сколько ждать следующих элементов альбома, прежде чем собрать его
+ALBUM_LATENCY_SECONDS = float(os.getenv("ALBUM_LATENCY_SECONDS", "0.7"))
+# FSM в базе: сколько держать состояние в памяти и через сколько
+# секунд сбрасывать накопившиеся изменения одной записью
+FSM_CACHE_TTL_SECONDS = float(os.getenv("FSM_CACHE_TTL_SECONDS", "300"))
+FSM_FLUSH_DELAY_SECONDS = float(os.getenv("FSM_FLUSH_DELAY_SECONDS", "0.05"))
+# режим работы: polling или webhook
+RUN_MODE = os.getenv("RUN_MODE", "polling")
+# вебхук: публичный адрес (пусто — не регистрировать в Telegram),
+# путь, секрет заголовка X-Telegram-Bot-Api-Secret-Token и где слушать
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# сколько апдейтов обрабатывать параллельно и сколько держать в очереди
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+# шардирование планировщика между процессами: число виртуальных шардов
+# (пост в шарде id % N), 0 — один процесс ведёт все посты
+SCHEDULER_SHARDS = int(os.getenv("SCHEDULER_SHARDS", "0"))
+# как часто процесс отмечается в scheduler_workers и через сколько
+# секунд без отметки его шарды забирают остальные
+WORKER_HEARTBEAT_SECONDS = int(os.getenv("WORKER_HEARTBEAT_SECONDS", "15"))
+WORKER_TTL_SECONDS = int(os.getenv("WORKER_TTL_SECONDS", "45"))
+# каналы для кросс-постинга через запятую (пусто — только CHANNEL_ID)
+# и во сколько из них пост отправляется одновременно
+CHANNEL_IDS = [
+    channel.strip()
+    for channel in os.getenv("CHANNEL_IDS", "").split(",")
+    if channel.strip()
+] or [CHANNEL_ID]
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "4"))
+# бот запущен в нескольких процессах (webhook за балансировщиком, шарды
+# планировщика) — то, что процесс кэширует у себя, соседи не обновят
+MULTI_PROCESS = os.getenv("MULTI_PROCESS", "0") == "1" or SCHEDULER_SHARDS > 0
+# индекс запланированных постов в памяти (список, календарь);
+# при нескольких процессах выключается — правки соседей сюда не приходят
+POST_INDEX_ENABLED = os.getenv("POST_INDEX_ENABLED", "1") == "1" and not MULTI_PROCESS
+# календарь: язык (ru / en) и сколько месяцев вперёд собирать заранее
+CALENDAR_LOCALE = os.getenv("CALENDAR_LOCALE", "ru")
+CALENDAR_PRECOMPUTE_MONTHS = int(os.getenv("CALENDAR_PRECOMPUTE_MONTHS", "3"))
+# анти-флуд для обычных пользователей: сообщений в секунду и запас
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "1"))
+THROTTLE_BURST = float(os.getenv("THROTTLE_BURST", "5"))
+# доля общего лимита TG_GLOBAL_PER_SECOND, которую эхо не трогает
+LOW_PRIORITY_RESERVE = float(os.getenv("LOW_PRIORITY_RESERVE", "0.5"))
 # HANNEL_ID = "@testformybotirinaa"
 # DB_PATH = "data/posts.db"
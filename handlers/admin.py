@@ -1,33 +1,52 @@
 from aiogram import Router, types, F, Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import (
-    InlineKeyboardMarkup,
-    InlineKeyboardButton,
-    InputMediaPhoto,
-    InputMediaVideo,
-    InputMediaDocument,
-    InputMediaAnimation,
-)
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from keyboards import callbacks as cb
 from keyboards.main_menu import admin_menu
 from keyboards.calendar_kb import build_date_choice_kb, build_calendar
-from keyboards.inline_admin import build_posts_list_kb
+from keyboards.inline_admin import build_posts_list_kb, build_channels_kb
+from middlewares.admin import admin_only
+from middlewares.album import AlbumMiddleware
 
-from datetime import datetime, timedelta
-from asyncio import create_task, sleep
+from datetime import date, datetime, timedelta
 import pytz
 import json
 
-from utils.db import save_post, get_pending_posts_page
-from utils.scheduler import schedule_post
-from config import CHANNEL_ID
+from utils.callback_router import CallbackRouter
+from utils.db import (
+    save_post,
+    get_failed_posts,
+    count_failed_posts,
+    get_held_posts,
+)
+from utils.logger import logger
+from utils.post_index import day_load, pending_count, pending_page
+from utils.payloads import compile_post
+from utils.recurrence import describe_rule, first_occurrence
+from utils.renderer import PostPayloadError, decode
+from utils.scheduler import (
+    fan_out,
+    schedule_post,
+    requeue_failed,
+    publish_held,
+    expire_held,
+)
+from utils.timeutils import from_ts, to_ts, format_ts
+from config import ADMIN_IDS, CHANNEL_IDS
 
 router = Router()
+# весь роутер — только для админов (is_admin ставит AdminGateMiddleware)
+router.message.filter(admin_only)
+router.callback_query.filter(admin_only)
+router.message.outer_middleware(AlbumMiddleware())
+callbacks = CallbackRouter()
 
 print("ADMIN ROUTER LOADED")
 
-ADMIN_ID = [8120213148, 882428172]
 PAGE_SIZE = 5
 LA = pytz.timezone("America/New_York")
 
@@ -39,12 +58,14 @@ LA = pytz.timezone("America/New_York")
 
 class AddPost(StatesGroup):
     waiting_for_content = State()
+    waiting_for_channels = State()
     waiting_for_action = State()
     waiting_for_date = State()
     waiting_for_time = State()
 
 
 def register_admin_handlers(dp):
+    callbacks.attach(router)
     dp.include_router(router)
 
 
@@ -58,72 +79,101 @@ def build_publish_or_schedule_kb():
         inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text="🚀 Опубликовать сейчас", callback_data="post_action:now"
+                    text="🚀 Опубликовать сейчас",
+                    callback_data=cb.PublishNow().pack(),
                 )
             ],
             [
                 InlineKeyboardButton(
-                    text="⏳ Запланировать", callback_data="post_action:schedule"
+                    text="⏳ Запланировать", callback_data=cb.Schedule().pack()
                 )
             ],
             [
                 InlineKeyboardButton(
-                    text="❌ Отменить", callback_data="post_action:cancel"
+                    text="🔁 Запланировать с повтором",
+                    callback_data=cb.ScheduleRepeat().pack(),
+                )
+            ],
+            [
+                InlineKeyboardButton(
+                    text="❌ Отменить", callback_data=cb.CancelPost().pack()
                 )
             ],
         ]
     )
 
 
-async def publish_now_to_channel(bot: Bot, content_type: str, raw_content: str):
-    chat_id = CHANNEL_ID
+# пресеты повтора: ключ в callback_data → (подпись, RRULE)
+REPEAT_PRESETS = {
+    "daily": ("Каждый день", "FREQ=DAILY"),
+    "weekdays": ("По будням", "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"),
+    "weekly": ("Каждую неделю", "FREQ=WEEKLY"),
+    "biweekly": ("Раз в две недели", "FREQ=WEEKLY;INTERVAL=2"),
+    "monthly": ("Каждый месяц", "FREQ=MONTHLY"),
+}
 
-    # --- TEXT ---
-    if content_type == "text":
-        await bot.send_message(chat_id, raw_content)
-        return
 
-    # --- ALBUM ---
-    if content_type == "media_group":
-        album = json.loads(raw_content)
-        media = []
-
-        caption = album.get("caption")
-        items = album["items"]
-
-        for idx, item in enumerate(items[:10]):
-            cap = caption if idx == 0 else None
-            if item["type"] == "photo":
-                media.append(InputMediaPhoto(item["file_id"], caption=cap))
-            elif item["type"] == "video":
-                media.append(InputMediaVideo(item["file_id"], caption=cap))
-            elif item["type"] == "document":
-                media.append(InputMediaDocument(item["file_id"], caption=cap))
-            elif item["type"] == "animation":
-                media.append(InputMediaAnimation(item["file_id"], caption=cap))
-
-        await bot.send_media_group(chat_id, media)
+def build_repeat_kb():
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=label, callback_data=cb.RepeatPreset(key=key).pack()
+                )
+            ]
+            for key, (label, _) in REPEAT_PRESETS.items()
+        ]
+    )
+
+
+def selected_targets(data: dict) -> list[int]:
+    """
+    Индексы выбранных каналов в CHANNEL_IDS; пока админ ничего
+    не менял — все каналы.
+    """
+    selected = data.get("targets")
+    if selected is None:
+        return list(range(len(CHANNEL_IDS)))
+    return [index for index in selected if index < len(CHANNEL_IDS)]
+
+
+async def publish_now_to_channels(
+    bot: Bot, content_type: str, raw_content: str, channel_ids: list[str]
+) -> list[str]:
+    """
+    Та же рассылка, что и у публикации по расписанию (scheduler.fan_out),
+    только пост ещё не сохранён — собирается без кэша.
+    Бросает PostPayloadError, если контент не разбирается.
+    Возвращает каналы, в которые отправить не удалось.
+    """
+    decode(content_type, raw_content)  # битый контент — до отправки
+    post = {"type": content_type, "content": raw_content}
+    errors = await fan_out(bot, post, channel_ids, prepare=compile_post)
+
+    for chat_id, error in errors.items():
+        logger.error("Publish now to %s failed: %s", chat_id, error)
+    return list(errors)
+
+
+async def ask_targets_or_action(
+    message: types.Message, state: FSMContext, accepted: str
+):
+    """
+    Контент принят: если каналов несколько — сначала выбор каналов,
+    иначе сразу «как публикуем».
+    """
+    if len(CHANNEL_IDS) > 1:
+        await state.set_state(AddPost.waiting_for_channels)
+        await message.answer(
+            f"{accepted} В какие каналы публикуем?",
+            reply_markup=build_channels_kb(CHANNEL_IDS, selected_targets({})),
+        )
         return
 
-    # --- SINGLE MEDIA ---
-    data = json.loads(raw_content)
-    file_id = data["file_id"]
-    caption = data.get("caption")
-
-    if content_type == "photo":
-        await bot.send_photo(chat_id, file_id, caption=caption)
-    elif content_type == "video":
-        await bot.send_video(chat_id, file_id, caption=caption)
-    elif content_type == "document":
-        await bot.send_document(chat_id, file_id, caption=caption)
-    elif content_type == "voice":
-        await bot.send_voice(chat_id, file_id, caption=caption)
-    elif content_type == "audio":
-        await bot.send_audio(chat_id, file_id, caption=caption)
-    elif content_type == "animation":
-        await bot.send_animation(chat_id, file_id, caption=caption)
-    elif content_type == "video_note":
-        await bot.send_video_note(chat_id, file_id)
+    await state.set_state(AddPost.waiting_for_action)
+    await message.answer(
+        f"{accepted} Как публикуем?", reply_markup=build_publish_or_schedule_kb()
+    )
 
 
 # ============================================================
@@ -133,11 +183,7 @@ async def publish_now_to_channel(bot: Bot, content_type: str, raw_content: str):
 
 @router.message(F.text == "📝 Добавить пост")
 async def add_post(message: types.Message, state: FSMContext):
-    if message.from_user.id not in ADMIN_ID:
-        return
-
     await state.set_state(AddPost.waiting_for_content)
-    await state.update_data(album=None)
 
     await message.answer(
         "Отправь мне пост, который нужно опубликовать.\n\n"
@@ -157,17 +203,15 @@ async def add_post(message: types.Message, state: FSMContext):
 
 @router.message(F.text == "📋 Мои запланированные")
 async def list_my_posts(message: types.Message):
-    if message.from_user.id not in ADMIN_ID:
-        return
-
     page = 1
-    posts = await get_pending_posts_page(PAGE_SIZE, 0)
+    posts = await pending_page(PAGE_SIZE)
 
     if not posts:
         await message.answer("У тебя нет запланированных постов 💤")
         return
 
-    kb = build_posts_list_kb(posts, page, PAGE_SIZE)
+    total = await pending_count()
+    kb = build_posts_list_kb(posts, page, PAGE_SIZE, total)
     await message.answer("Вот твои запланированные посты:", reply_markup=kb)
 
 
@@ -177,92 +221,46 @@ async def list_my_posts(message: types.Message):
 
 
 @router.message(AddPost.waiting_for_content)
-async def process_content(message: types.Message, state: FSMContext):
-    data = await state.get_data()
-
+async def process_content(
+    message: types.Message,
+    state: FSMContext,
+    album: list[types.Message] | None = None,
+):
     # ----------------------------------------------------------
-    # Альбом (media_group)
+    # Альбом (media_group) — AlbumMiddleware отдаёт его целиком
     # ----------------------------------------------------------
-    if message.media_group_id:
-        album = data.get("album")
-
-        if not album:
-            album = {
-                "media_group_id": message.media_group_id,
-                "items": [],
-                "caption": None,
-            }
-
-        if message.caption and not album["caption"]:
-            album["caption"] = message.caption
-
-        if message.photo:
-            album["items"].append(
-                {"type": "photo", "file_id": message.photo[-1].file_id}
-            )
-        elif message.video:
-            album["items"].append({"type": "video", "file_id": message.video.file_id})
-        elif message.document:
-            album["items"].append(
-                {"type": "document", "file_id": message.document.file_id}
-            )
-        elif message.animation:
-            album["items"].append(
-                {"type": "animation", "file_id": message.animation.file_id}
-            )
-        else:
-            await message.answer(
-                "В альбом можно добавлять только фото, видео, GIF и документы."
-            )
-            return
-
-        album["items"] = album["items"][:10]
-        await state.update_data(album=album)
-
-        async def finish(group_id):
-            await sleep(0.7)
-            d = await state.get_data()
-            last = d.get("album")
-
-            if not last or last["media_group_id"] != group_id:
+    if album:
+        items = []
+        caption = None
+
+        for item in album:
+            if item.caption and not caption:
+                caption = item.caption
+
+            if item.photo:
+                items.append({"type": "photo", "file_id": item.photo[-1].file_id})
+            elif item.video:
+                items.append({"type": "video", "file_id": item.video.file_id})
+            elif item.document:
+                items.append({"type": "document", "file_id": item.document.file_id})
+            elif item.animation:
+                items.append(
+                    {"type": "animation", "file_id": item.animation.file_id}
+                )
+            else:
+                await message.answer(
+                    "В альбом можно добавлять только фото, видео, GIF и документы."
+                )
                 return
 
-            await state.update_data(
-                content_type="media_group",
-                content=json.dumps(
-                    {"items": last["items"], "caption": last["caption"]},
-                    ensure_ascii=False,
-                ),
-                album=None,
-            )
-
-            await state.set_state(AddPost.waiting_for_action)
-            await message.answer(
-                "Альбом принят! Как публикуем?",
-                reply_markup=build_publish_or_schedule_kb(),
-            )
-
-        create_task(finish(message.media_group_id))
-        return
-
-    # ----------------------------------------------------------
-    # Альбом завершён, приходит новое сообщение
-    # ----------------------------------------------------------
-    if data.get("album"):
-        album = data["album"]
         await state.update_data(
             content_type="media_group",
             content=json.dumps(
-                {"items": album["items"], "caption": album["caption"]},
-                ensure_ascii=False,
+                {"items": items[:10], "caption": caption}, ensure_ascii=False
             ),
-            album=None,
         )
 
-        await state.set_state(AddPost.waiting_for_action)
-        await message.answer(
-            "Альбом принят! Как публикуем?", reply_markup=build_publish_or_schedule_kb()
-        )
+        await ask_targets_or_action(message, state, "Альбом принят!")
         return
 
     # ----------------------------------------------------------
@@ -335,41 +333,106 @@ async def process_content(message: types.Message, state: FSMContext):
         await message.answer("Этот тип контента пока не поддерживается.")
         return
 
-    # Показываем выбор действия
+    # Показываем выбор каналов / действия
+    await ask_targets_or_action(message, state, "Пост получен!")
+
+
+# ============================================================
+#               3.1 ВЫБОР КАНАЛОВ
+# ============================================================
+
+
+@callbacks(cb.TargetToggle, AddPost.waiting_for_channels)
+async def toggle_target(
+    callback: types.CallbackQuery, callback_data: cb.TargetToggle, state: FSMContext
+):
+    selected = set(selected_targets(await state.get_data()))
+    selected ^= {callback_data.index}
+
+    await state.update_data(targets=sorted(selected))
+    await callback.message.edit_reply_markup(
+        reply_markup=build_channels_kb(CHANNEL_IDS, sorted(selected))
+    )
+    await callback.answer()
+
+
+@callbacks(cb.TargetDone, AddPost.waiting_for_channels)
+async def targets_done(callback: types.CallbackQuery, state: FSMContext):
+    if not selected_targets(await state.get_data()):
+        await callback.answer("Выбери хотя бы один канал", show_alert=True)
+        return
+
     await state.set_state(AddPost.waiting_for_action)
-    await message.answer(
-        "Пост получен! Как публикуем?", reply_markup=build_publish_or_schedule_kb()
+    await callback.message.edit_text(
+        "Как публикуем?", reply_markup=build_publish_or_schedule_kb()
     )
+    await callback.answer()
 
 
 # ============================================================
-#               3.1 ВЫБОР ДЕЙСТВИЯ
+#               3.2 ВЫБОР ДЕЙСТВИЯ
 # ============================================================
 
 
-@router.callback_query(AddPost.waiting_for_action, F.data == "post_action:cancel")
+@callbacks(cb.CancelPost, AddPost.waiting_for_action)
 async def cancel_post(callback: types.CallbackQuery, state: FSMContext):
     await state.clear()
     await callback.message.edit_text("Пост отменён ❌")
     await callback.answer()
 
 
-@router.callback_query(AddPost.waiting_for_action, F.data == "post_action:now")
+@callbacks(cb.PublishNow, AddPost.waiting_for_action)
 async def publish_now(callback: types.CallbackQuery, state: FSMContext):
     data = await state.get_data()
+    channel_ids = [CHANNEL_IDS[index] for index in selected_targets(data)]
 
-    await publish_now_to_channel(
-        callback.message.bot,
-        data["content_type"],
-        data["content"],
-    )
+    try:
+        failed = await publish_now_to_channels(
+            callback.message.bot,
+            data["content_type"],
+            data["content"],
+            channel_ids,
+        )
+    except PostPayloadError:
+        await state.clear()
+        await callback.message.edit_text("Ошибка: пост повреждён ❌")
+        await callback.message.answer("Что дальше?", reply_markup=admin_menu())
+        return
 
     await state.clear()
-    await callback.message.edit_text("Пост опубликован прямо сейчас ✅")
+    if failed:
+        await callback.message.edit_text(
+            f"Опубликовано в {len(channel_ids) - len(failed)} из {len(channel_ids)}"
+            f" каналов. Не удалось: {', '.join(failed)} ⚠️"
+        )
+    else:
+        await callback.message.edit_text("Пост опубликован прямо сейчас ✅")
     await callback.message.answer("Что дальше?", reply_markup=admin_menu())
 
 
-@router.callback_query(AddPost.waiting_for_action, F.data == "post_action:schedule")
+@callbacks(cb.ScheduleRepeat, AddPost.waiting_for_action)
+async def choose_repeat(callback: types.CallbackQuery, state: FSMContext):
+    await callback.message.edit_text(
+        "Как часто повторять?\n"
+        "Первая публикация — в дату и время, которые выберешь дальше.",
+        reply_markup=build_repeat_kb(),
+    )
+    await callback.answer()
+
+
+@callbacks(cb.RepeatPreset, AddPost.waiting_for_action)
+async def pick_repeat(
+    callback: types.CallbackQuery, callback_data: cb.RepeatPreset, state: FSMContext
+):
+    preset = REPEAT_PRESETS.get(callback_data.key)
+    if preset is None:
+        return await callback.answer()
+
+    await state.update_data(rrule=preset[1])
+    await choose_schedule(callback, state)
+
+
+@callbacks(cb.Schedule, AddPost.waiting_for_action)
 async def choose_schedule(callback: types.CallbackQuery, state: FSMContext):
     await state.set_state(AddPost.waiting_for_date)
 
@@ -384,19 +447,11 @@ async def choose_schedule(callback: types.CallbackQuery, state: FSMContext):
 # ============================================================
 
 
-@router.callback_query(AddPost.waiting_for_date, F.data.startswith("pick_date:"))
-async def pick_quick_date(callback: types.CallbackQuery, state: FSMContext):
-    data = callback.data.split(":")[1]
-    today = datetime.now(LA).date()
-
-    if data == "today":
-        chosen = today
-    elif data == "tomorrow":
-        chosen = today + timedelta(days=1)
-    elif data == "after2":
-        chosen = today + timedelta(days=2)
-    else:
-        chosen = datetime.strptime(data, "%Y-%m-%d").date()
+@callbacks(cb.QuickDate, AddPost.waiting_for_date)
+async def pick_quick_date(
+    callback: types.CallbackQuery, callback_data: cb.QuickDate, state: FSMContext
+):
+    chosen = datetime.now(LA).date() + timedelta(days=callback_data.days)
 
     await state.update_data(chosen_date=str(chosen))
     await state.set_state(AddPost.waiting_for_time)
@@ -407,49 +462,32 @@ async def pick_quick_date(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+async def calendar_with_load(year: int, month: int) -> InlineKeyboardMarkup:
+    # в ячейках — сколько постов на день уже запланировано
+    return build_calendar(year, month, load=await day_load(year, month))
+
+
 # ------------- Открыть календарь -------------
-@router.callback_query(F.data == "open_calendar")
+@callbacks(cb.OpenCalendar)
 async def open_calendar(callback: types.CallbackQuery):
     now = datetime.now(LA)
-    kb = build_calendar(now.year, now.month)
+    kb = await calendar_with_load(now.year, now.month)
 
     await callback.message.edit_text("Выбери дату:", reply_markup=kb)
     await callback.answer()
 
 
 # ------------- Переключение месяцев -------------
-@router.callback_query(F.data.startswith("calendar_prev:"))
-async def prev_month(callback: types.CallbackQuery):
-    _, year, month = callback.data.split(":")
-    year = int(year)
-    month = int(month) - 1
-
-    if month == 0:
-        month = 12
-        year -= 1
-
-    kb = build_calendar(year, month)
-    await callback.message.edit_text("Выбери дату:", reply_markup=kb)
-    await callback.answer()
-
-
-@router.callback_query(F.data.startswith("calendar_next:"))
-async def next_month(callback: types.CallbackQuery):
-    _, year, month = callback.data.split(":")
-    year = int(year)
-    month = int(month) + 1
-
-    if month == 13:
-        month = 1
-        year += 1
-
-    kb = build_calendar(year, month)
+@callbacks(cb.CalendarMonth)
+async def show_month(callback: types.CallbackQuery, callback_data: cb.CalendarMonth):
+    # в кнопках «/» уже лежит соседний месяц
+    kb = await calendar_with_load(callback_data.year, callback_data.month)
     await callback.message.edit_text("Выбери дату:", reply_markup=kb)
     await callback.answer()
 
 
 # ------------- Закрыть календарь -------------
-@router.callback_query(F.data == "calendar_close")
+@callbacks(cb.CalendarClose)
 async def close_calendar(callback: types.CallbackQuery):
     await callback.message.edit_text(
         "Выбери дату публикации (New York):", reply_markup=build_date_choice_kb()
@@ -457,10 +495,18 @@ async def close_calendar(callback: types.CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("calendar_pick:"))
-async def pick_quick_date(callback: types.CallbackQuery, state: FSMContext):
-    date_str = callback.data.split(":")[1]
-    await state.update_data(chosen_date=date_str)
+# ------------- Кнопки-надписи («стр. X/Y», заголовки) -------------
+@callbacks(cb.Noop)
+async def noop(callback: types.CallbackQuery):
+    await callback.answer()
+
+
+@callbacks(cb.CalendarPick)
+async def pick_calendar_date(
+    callback: types.CallbackQuery, callback_data: cb.CalendarPick, state: FSMContext
+):
+    chosen = date.fromordinal(callback_data.day)
+    await state.update_data(chosen_date=str(chosen))
 
     await state.set_state(AddPost.waiting_for_time)
     await callback.message.edit_text(
@@ -495,16 +541,30 @@ async def choose_time(message: types.Message, state: FSMContext):
     if isinstance(content, dict):
         content = json.dumps(content, ensure_ascii=False)
 
+    rrule = data.get("rrule")
+    if rrule:
+        # выбранный день может не подходить правилу — серия начинается
+        # с первого настоящего вхождения, от него и считается дальше
+        first_ts = first_occurrence(rrule, to_ts(publish_dt))
+        if first_ts is None:
+            await message.answer("По этому правилу с выбранной даты публикаций нет.")
+            return
+        publish_dt = from_ts(first_ts)
+
+    channel_ids = [CHANNEL_IDS[index] for index in selected_targets(data)]
     post_id = await save_post(
-        data["content_type"], content, CHANNEL_ID, publish_dt.isoformat()
+        data["content_type"], content, channel_ids, to_ts(publish_dt), rrule
     )
 
     schedule_post(message.bot, post_id, publish_dt)
 
-    await message.answer(
-        f"Готово! 🎉\nПост запланирован на {publish_dt.strftime('%Y-%m-%d %H:%M')} New York.",
-        reply_markup=admin_menu(),
+    text = (
+        "Готово! 🎉\n"
+        f"Пост запланирован на {publish_dt.strftime('%Y-%m-%d %H:%M')} New York."
     )
+    if rrule:
+        text += f"\nПовтор: {describe_rule(rrule)} 🔁"
+    await message.answer(text, reply_markup=admin_menu())
 
     await state.clear()
 
@@ -514,21 +574,135 @@ async def choose_time(message: types.Message, state: FSMContext):
 # ============================================================
 
 
-@router.callback_query(F.data.startswith("posts_page:"))
-async def paginate_posts(callback: types.CallbackQuery):
-    if callback.from_user.id not in ADMIN_ID:
-        return await callback.answer()
-
-    _, page_str = callback.data.split(":")
-    page = int(page_str)
-    offset = (page - 1) * PAGE_SIZE
+@callbacks(cb.PostsPage)
+async def paginate_posts(callback: types.CallbackQuery, callback_data: cb.PostsPage):
+    page = callback_data.page
+    cursor = (callback_data.ts, callback_data.id)
 
-    posts = await get_pending_posts_page(PAGE_SIZE, offset)
+    if callback_data.before:
+        posts = await pending_page(PAGE_SIZE, before=cursor)
+    else:
+        posts = await pending_page(PAGE_SIZE, after=cursor)
 
     if not posts:
         await callback.message.edit_text("Нет постов 💤")
         return
 
-    kb = build_posts_list_kb(posts, page, PAGE_SIZE)
+    total = await pending_count()
+    # пока листали, посты могли опубликоваться/удалиться
+    page = max(1, min(page, -(-total // PAGE_SIZE)))
+    if callback_data.before and len(posts) < PAGE_SIZE:
+        page = 1
+
+    kb = build_posts_list_kb(posts, page, PAGE_SIZE, total)
     await callback.message.edit_text("Вот твои запланированные посты:", reply_markup=kb)
     await callback.answer()
+
+
+# ============================================================
+#           7. НЕУДАЧНЫЕ ПУБЛИКАЦИИ (DEAD LETTER)
+# ============================================================
+
+FAILED_SHOW_LIMIT = 10
+
+
+@router.message(Command("failed"))
+async def list_failed_posts(message: types.Message):
+    total = await count_failed_posts()
+    if not total:
+        await message.answer("Неудачных публикаций нет ✅")
+        return
+
+    posts = await get_failed_posts(FAILED_SHOW_LIMIT)
+    lines = [f"Не удалось опубликовать: {total}\n"]
+    for post in posts:
+        lines.append(
+            f"#{post['id']} • {format_ts(post['publish_ts'])} • "
+            f"попыток: {post['attempts']}\n{post['error']}"
+        )
+    if total > len(posts):
+        lines.append(f"…и ещё {total - len(posts)}")
+
+    kb = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="🔁 Перезапустить все",
+                    callback_data=cb.RequeueFailed().pack(),
+                )
+            ]
+        ]
+    )
+    await message.answer("\n\n".join(lines), reply_markup=kb)
+
+
+@callbacks(cb.RequeueFailed)
+async def requeue_failed_posts_handler(callback: types.CallbackQuery):
+    count = await requeue_failed(callback.message.bot)
+
+    await callback.message.edit_text(f"Вернул в очередь постов: {count} 🔁")
+    await callback.answer()
+
+
+# ============================================================
+#        8. ПРОСРОЧЕННЫЕ ЗА ВРЕМЯ ПРОСТОЯ (OVERDUE_POLICY=ask)
+# ============================================================
+
+HELD_SHOW_LIMIT = 10
+
+
+async def notify_overdue(bot: Bot):
+    """
+    Вызывается при старте: если есть посты, ждущие решения
+    (просрочены сильнее OVERDUE_CATCHUP_MINUTES), спрашиваем админов.
+    """
+    posts = await get_held_posts()
+    if not posts:
+        return
+
+    lines = [f"Пока бот не работал, пропущено постов: {len(posts)}\n"]
+    for post in posts[:HELD_SHOW_LIMIT]:
+        due = format_ts(post["publish_ts"])
+        lines.append(f"#{post['id']} • должен был выйти {due}")
+    if len(posts) > HELD_SHOW_LIMIT:
+        lines.append(f"…и ещё {len(posts) - HELD_SHOW_LIMIT}")
+    lines.append("\nЧто с ними сделать?")
+
+    kb = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="🚀 Опубликовать все",
+                    callback_data=cb.ResolveOverdue(publish=True).pack(),
+                )
+            ],
+            [
+                InlineKeyboardButton(
+                    text="🗑 Пропустить все",
+                    callback_data=cb.ResolveOverdue(publish=False).pack(),
+                )
+            ],
+        ]
+    )
+
+    for admin_id in sorted(ADMIN_IDS):
+        try:
+            await bot.send_message(admin_id, "\n".join(lines), reply_markup=kb)
+        except TelegramAPIError as e:
+            logger.warning("Cannot notify admin %s: %s", admin_id, e)
+
+
+@callbacks(cb.ResolveOverdue)
+async def resolve_overdue(
+    callback: types.CallbackQuery, callback_data: cb.ResolveOverdue
+):
+    if callback_data.publish:
+        count = await publish_held(callback.message.bot)
+        text = f"Публикую пропущенные посты: {count} 🚀"
+    else:
+        count = await expire_held()
+        text = f"Пропущенные посты отменены: {count} 🗑"
+
+    # другой админ мог уже ответить — тогда count == 0
+    await callback.message.edit_text(text if count else "Уже решено ✅")
+    await callback.answer()
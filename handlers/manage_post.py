@@ -1,14 +1,7 @@
-from aiogram import Router, F, types, Bot
+from aiogram import Router, types, Bot
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import (
-    InlineKeyboardMarkup,
-    InlineKeyboardButton,
-    InputMediaPhoto,
-    InputMediaVideo,
-    InputMediaDocument,
-    InputMediaAnimation,
-)
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 import json
 from datetime import datetime
@@ -16,14 +9,25 @@ import pytz
 
 from utils.db import (
     get_scheduled_posts,
-    update_post,
+    set_post_caption,
+    replace_post_media,
+    shift_post_time,
     delete_post,
-    get_pending_posts_page,
 )
+from utils.locks import post_locks
+from utils.post_index import pending_count, pending_page
+from utils.renderer import PostPayloadError, decode_post, render
 from utils.scheduler import reschedule_post, remove_scheduled_post
+from utils.timeutils import from_ts, to_ts
+from keyboards import callbacks as cb
 from keyboards.inline_admin import build_posts_list_kb
+from middlewares.admin import admin_only
+from utils.callback_router import CallbackRouter
 
 router = Router()
+router.message.filter(admin_only)
+router.callback_query.filter(admin_only)
+callbacks = CallbackRouter()
 LA = pytz.timezone("America/New_York")
 PAGE_SIZE = 5  # такой же, как в admin.py
 
@@ -48,43 +52,49 @@ class EditTime(StatesGroup):
 
 
 def register_manage_post_handlers(dp):
+    callbacks.attach(router)
     dp.include_router(router)
 
 
 # ============= КЛАВИАТУРА ПОД ПОСТОМ =============
 
 
-def manage_keyboard(post_id: int) -> InlineKeyboardMarkup:
+def manage_keyboard(post_id: int, version: int) -> InlineKeyboardMarkup:
+    """
+    В callback_data — версия поста на момент превью: правка применится,
+    только если с тех пор пост никто не менял.
+    """
+    ref = {"id": post_id, "version": version}
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
                     text="✏️ Редактировать текст",
-                    callback_data=f"edit_text:{post_id}",
+                    callback_data=cb.EditText(**ref).pack(),
                 )
             ],
             [
                 InlineKeyboardButton(
                     text="🖼 Редактировать медиа",
-                    callback_data=f"edit_media:{post_id}",
+                    callback_data=cb.EditMedia(**ref).pack(),
                 )
             ],
             [
                 InlineKeyboardButton(
-                    text="📅 Дата", callback_data=f"edit_date:{post_id}"
+                    text="📅 Дата", callback_data=cb.EditDate(**ref).pack()
                 ),
                 InlineKeyboardButton(
-                    text="⏰ Время", callback_data=f"edit_time:{post_id}"
+                    text="⏰ Время", callback_data=cb.EditTime(**ref).pack()
                 ),
             ],
             [
                 InlineKeyboardButton(
-                    text="🗑 Удалить пост", callback_data=f"delete_post:{post_id}"
+                    text="🗑 Удалить пост", callback_data=cb.DeletePost(**ref).pack()
                 )
             ],
             [
                 InlineKeyboardButton(
-                    text="⬅ Назад к списку", callback_data="back_to_list"
+                    text="⬅ Назад к списку", callback_data=cb.BackToList().pack()
                 )
             ],
         ]
@@ -97,98 +107,39 @@ def manage_keyboard(post_id: int) -> InlineKeyboardMarkup:
 async def send_post_preview(bot: Bot, admin_id: int, post: dict):
     """
     Отправляем превью поста администратору + inline-меню управления.
+    Отрисовка — тем же движком, что и публикация в канал.
     """
+    try:
+        payload = decode_post(post)
+    except PostPayloadError:
+        await bot.send_message(admin_id, "Ошибка: повреждён JSON контента")
+        return
 
-    post_type = post["type"]
-    raw = post["content"]
+    kb = manage_keyboard(post["id"], post["version"])
 
-    # ---------- TEXT ----------
-    if post_type == "text":
-        await bot.send_message(admin_id, raw, reply_markup=manage_keyboard(post["id"]))
-        return
+    # у альбома клавиатуры быть не может — она уходит отдельным сообщением
+    is_album = payload.type == "media_group"
 
-    # ---------- MEDIA GROUP (ALBUM) ----------
-    if post_type == "media_group":
-        try:
-            album = json.loads(raw)  # {"items": [...], "caption": "..."}
-        except Exception:
-            await bot.send_message(admin_id, "Ошибка: повреждён media_group JSON")
-            return
-
-        items = album.get("items", [])
-        caption = album.get("caption")
-
-        media = []
-        for idx, item in enumerate(items[:10]):
-            itype = item["type"]
-            file_id = item["file_id"]
-            cap = caption if idx == 0 else None
-
-            if itype == "photo":
-                media.append(InputMediaPhoto(media=file_id, caption=cap))
-            elif itype == "video":
-                media.append(InputMediaVideo(media=file_id, caption=cap))
-            elif itype == "document":
-                media.append(InputMediaDocument(media=file_id, caption=cap))
-            elif itype == "animation":
-                media.append(InputMediaAnimation(media=file_id, caption=cap))
-
-        if media:
-            await bot.send_media_group(admin_id, media)
-
-        # отдельно сообщение с клавиатурой
+    for request in render(payload, admin_id, None if is_album else kb):
+        await bot(request)
+
+    if is_album:
         await bot.send_message(
             admin_id,
             f"Управление альбомом #{post['id']}:",
-            reply_markup=manage_keyboard(post["id"]),
+            reply_markup=kb,
         )
-        return
 
-    # ---------- SINGLE MEDIA ----------
-    try:
-        data = json.loads(raw)
-    except Exception:
-        await bot.send_message(admin_id, "Ошибка: повреждён JSON контента")
-        return
 
-    file_id = data.get("file_id")
-    caption = data.get("caption")
-
-    if post_type == "photo":
-        await bot.send_photo(
-            admin_id, file_id, caption=caption, reply_markup=manage_keyboard(post["id"])
-        )
-    elif post_type == "video":
-        await bot.send_video(
-            admin_id, file_id, caption=caption, reply_markup=manage_keyboard(post["id"])
-        )
-    elif post_type == "document":
-        await bot.send_document(
-            admin_id, file_id, caption=caption, reply_markup=manage_keyboard(post["id"])
-        )
-    elif post_type == "audio":
-        await bot.send_audio(
-            admin_id, file_id, caption=caption, reply_markup=manage_keyboard(post["id"])
-        )
-    elif post_type == "voice":
-        await bot.send_voice(
-            admin_id, file_id, caption=caption, reply_markup=manage_keyboard(post["id"])
-        )
-    elif post_type == "animation":
-        await bot.send_animation(
-            admin_id, file_id, caption=caption, reply_markup=manage_keyboard(post["id"])
-        )
+STALE_POST = "Пост изменился или публикуется прямо сейчас — открой его заново 🔄"
 
 
 # ============= ОТКРЫТЬ ПОСТ ИЗ СПИСКА =============
 
 
-@router.callback_query(F.data.startswith("post_open:"))
-async def open_post(callback: types.CallbackQuery):
-    _, post_id_str, _page_str = callback.data.split(":")
-    post_id = int(post_id_str)
-
-    post = await get_scheduled_posts(post_id)
+@callbacks(cb.OpenPost)
+async def open_post(callback: types.CallbackQuery, callback_data: cb.OpenPost):
+    post = await get_scheduled_posts(callback_data.id)
     if not post:
         await callback.answer("Пост не найден 😕", show_alert=True)
         return
@@ -200,10 +151,13 @@ async def open_post(callback: types.CallbackQuery):
 # ============= EDIT TEXT =============
 
 
-@router.callback_query(F.data.startswith("edit_text:"))
-async def start_edit_text(callback: types.CallbackQuery, state: FSMContext):
-    post_id = int(callback.data.split(":")[1])
-    await state.update_data(edit_post_id=post_id)
+@callbacks(cb.EditText)
+async def start_edit_text(
+    callback: types.CallbackQuery, callback_data: cb.EditText, state: FSMContext
+):
+    await state.update_data(
+        edit_post_id=callback_data.id, edit_version=callback_data.version
+    )
 
     await callback.message.answer("Отправь новый текст поста:")
     await state.set_state(EditText.waiting_new_text)
@@ -212,34 +166,26 @@ async def start_edit_text(callback: types.CallbackQuery, state: FSMContext):
 
 @router.message(EditText.waiting_new_text)
 async def save_new_text(message: types.Message, state: FSMContext):
+    if not message.text:
+        await message.answer("Нужен именно текст. Отправь новый текст поста:")
+        return
+
     data = await state.get_data()
     post_id = data["edit_post_id"]
 
-    post = await get_scheduled_posts(post_id)
+    # одно UPDATE ... RETURNING: подпись меняется внутри JSON прямо в SQLite
+    async with post_locks[post_id]:
+        post = await set_post_caption(
+            post_id, message.text, expected_version=data.get("edit_version")
+        )
+
     if not post:
-        await message.answer("Пост не найден 😕")
+        await message.answer(STALE_POST)
         await state.clear()
         return
 
-    if post["type"] == "text":
-        new_content = message.text
-
-    elif post["type"] == "media_group":
-        album = json.loads(post["content"])
-        album["caption"] = message.text
-        new_content = json.dumps(album, ensure_ascii=False)
-
-    else:
-        raw = json.loads(post["content"])
-        raw["caption"] = message.text
-        new_content = json.dumps(raw, ensure_ascii=False)
-
-    await update_post(post_id, new_content)
-
     await message.answer("Текст обновлён ✅")
-    await send_post_preview(
-        message.bot, message.from_user.id, await get_scheduled_posts(post_id)
-    )
+    await send_post_preview(message.bot, message.from_user.id, post)
 
     await state.clear()
 
@@ -247,10 +193,13 @@ async def save_new_text(message: types.Message, state: FSMContext):
 # ============= EDIT MEDIA =============
 
 
-@router.callback_query(F.data.startswith("edit_media:"))
-async def start_edit_media(callback: types.CallbackQuery, state: FSMContext):
-    post_id = int(callback.data.split(":")[1])
-    await state.update_data(edit_post_id=post_id)
+@callbacks(cb.EditMedia)
+async def start_edit_media(
+    callback: types.CallbackQuery, callback_data: cb.EditMedia, state: FSMContext
+):
+    await state.update_data(
+        edit_post_id=callback_data.id, edit_version=callback_data.version
+    )
 
     await callback.message.answer(
         "Пришли новое медиа (фото/видео/документ и т.д.).\n"
@@ -266,21 +215,6 @@ async def save_new_media(message: types.Message, state: FSMContext):
     data = await state.get_data()
     post_id = data["edit_post_id"]
 
-    post = await get_scheduled_posts(post_id)
-    if not post:
-        await message.answer("Пост не найден 😕")
-        await state.clear()
-        return
-
-    # если это альбом — не трогаем медиа, только текст (см. сообщение выше)
-    if post["type"] == "media_group":
-        await message.answer(
-            "Медиа альбома нельзя менять, только текст.\n"
-            "Если нужно другой набор картинок — удали пост и создай заново."
-        )
-        await state.clear()
-        return
-
     # одиночное медиа
     if message.photo:
         t = "photo"
@@ -304,12 +238,29 @@ async def save_new_media(message: types.Message, state: FSMContext):
         await message.answer("Этот тип медиа не поддерживается.")
         return
 
-    await update_post(post_id, json.dumps(payload, ensure_ascii=False), t)
+    async with post_locks[post_id]:
+        post = await replace_post_media(
+            post_id,
+            t,
+            json.dumps(payload, ensure_ascii=False),
+            expected_version=data.get("edit_version"),
+        )
+
+    if not post:
+        # не применилось: пост изменился — или это альбом, его медиа не меняем
+        current = await get_scheduled_posts(post_id)
+        if current and current["type"] == "media_group":
+            await message.answer(
+                "Медиа альбома нельзя менять, только текст.\n"
+                "Если нужно другой набор картинок — удали пост и создай заново."
+            )
+        else:
+            await message.answer(STALE_POST)
+        await state.clear()
+        return
 
     await message.answer("Медиа обновлено ✅")
-    await send_post_preview(
-        message.bot, message.from_user.id, await get_scheduled_posts(post_id)
-    )
+    await send_post_preview(message.bot, message.from_user.id, post)
 
     await state.clear()
 
@@ -317,10 +268,13 @@ async def save_new_media(message: types.Message, state: FSMContext):
 # ============= EDIT DATE =============
 
 
-@router.callback_query(F.data.startswith("edit_date:"))
-async def start_edit_date(callback: types.CallbackQuery, state: FSMContext):
-    post_id = int(callback.data.split(":")[1])
-    await state.update_data(edit_post_id=post_id)
+@callbacks(cb.EditDate)
+async def start_edit_date(
+    callback: types.CallbackQuery, callback_data: cb.EditDate, state: FSMContext
+):
+    await state.update_data(
+        edit_post_id=callback_data.id, edit_version=callback_data.version
+    )
 
     await callback.message.answer("Введи новую дату (формат YYYY-MM-DD):")
     await state.set_state(EditDate.waiting_new_date)
@@ -338,31 +292,34 @@ async def save_new_date(message: types.Message, state: FSMContext):
     data = await state.get_data()
     post_id = data["edit_post_id"]
 
-    post = await get_scheduled_posts(post_id)
-    if not post:
-        await message.answer("Пост не найден 😕")
-        await state.clear()
-        return
-
-    old_dt = datetime.fromisoformat(post["publish_time"])
+    def with_new_date(old_ts: int) -> int:
+        old_dt = from_ts(old_ts)
+        return to_ts(
+            LA.localize(
+                datetime(
+                    new_date.year,
+                    new_date.month,
+                    new_date.day,
+                    old_dt.hour,
+                    old_dt.minute,
+                )
+            )
+        )
 
-    new_dt = LA.localize(
-        datetime(
-            new_date.year,
-            new_date.month,
-            new_date.day,
-            old_dt.hour,
-            old_dt.minute,
+    async with post_locks[post_id]:
+        post = await shift_post_time(
+            post_id, with_new_date, expected_version=data.get("edit_version")
         )
-    )
+        if post:
+            reschedule_post(post_id, from_ts(post["publish_ts"]))
 
-    await update_post(post_id, None, None, new_dt.isoformat())
-    reschedule_post(post_id, new_dt)
+    if not post:
+        await message.answer(STALE_POST)
+        await state.clear()
+        return
 
     await message.answer("Дата обновлена ✅")
-    await send_post_preview(
-        message.bot, message.from_user.id, await get_scheduled_posts(post_id)
-    )
+    await send_post_preview(message.bot, message.from_user.id, post)
 
     await state.clear()
 
@@ -370,10 +327,13 @@ async def save_new_date(message: types.Message, state: FSMContext):
 # ============= EDIT TIME =============
 
 
-@router.callback_query(F.data.startswith("edit_time:"))
-async def start_edit_time(callback: types.CallbackQuery, state: FSMContext):
-    post_id = int(callback.data.split(":")[1])
-    await state.update_data(edit_post_id=post_id)
+@callbacks(cb.EditTime)
+async def start_edit_time(
+    callback: types.CallbackQuery, callback_data: cb.EditTime, state: FSMContext
+):
+    await state.update_data(
+        edit_post_id=callback_data.id, edit_version=callback_data.version
+    )
 
     await callback.message.answer("Введи новое время (формат ЧЧ ММ):")
     await state.set_state(EditTime.waiting_new_time)
@@ -384,6 +344,8 @@ async def start_edit_time(callback: types.CallbackQuery, state: FSMContext):
 async def save_new_time(message: types.Message, state: FSMContext):
     try:
         hour, minute = map(int, message.text.split())
+        if hour > 23 or minute > 59:
+            raise ValueError
     except Exception:
         await message.answer("Неверный формат. Пример: 14 30")
         return
@@ -391,23 +353,26 @@ async def save_new_time(message: types.Message, state: FSMContext):
     data = await state.get_data()
     post_id = data["edit_post_id"]
 
-    post = await get_scheduled_posts(post_id)
+    def with_new_time(old_ts: int) -> int:
+        old_dt = from_ts(old_ts)
+        return to_ts(
+            LA.localize(datetime(old_dt.year, old_dt.month, old_dt.day, hour, minute))
+        )
+
+    async with post_locks[post_id]:
+        post = await shift_post_time(
+            post_id, with_new_time, expected_version=data.get("edit_version")
+        )
+        if post:
+            reschedule_post(post_id, from_ts(post["publish_ts"]))
+
     if not post:
-        await message.answer("Пост не найден 😕")
+        await message.answer(STALE_POST)
         await state.clear()
         return
 
-    old_dt = datetime.fromisoformat(post["publish_time"])
-
-    new_dt = LA.localize(datetime(old_dt.year, old_dt.month, old_dt.day, hour, minute))
-
-    await update_post(post_id, None, None, new_dt.isoformat())
-    reschedule_post(post_id, new_dt)
-
     await message.answer("Время обновлено ✅")
-    await send_post_preview(
-        message.bot, message.from_user.id, await get_scheduled_posts(post_id)
-    )
+    await send_post_preview(message.bot, message.from_user.id, post)
 
     await state.clear()
 
@@ -415,12 +380,21 @@ async def save_new_time(message: types.Message, state: FSMContext):
 # ============= DELETE POST =============
 
 
-@router.callback_query(F.data.startswith("delete_post:"))
-async def delete_post_handler(callback: types.CallbackQuery):
-    post_id = int(callback.data.split(":")[1])
+@callbacks(cb.DeletePost)
+async def delete_post_handler(
+    callback: types.CallbackQuery, callback_data: cb.DeletePost
+):
+    post_id, version = callback_data.id, callback_data.version
 
-    await delete_post(post_id)
-    remove_scheduled_post(post_id)
+    # публикация этого поста (если идёт) сначала завершится
+    async with post_locks[post_id]:
+        deleted = await delete_post(post_id, expected_version=version)
+        if deleted:
+            remove_scheduled_post(post_id)
+
+    if not deleted:
+        await callback.answer(STALE_POST, show_alert=True)
+        return
 
     await callback.message.answer("Пост удалён ✅")
     await callback.answer()
@@ -429,19 +403,19 @@ async def delete_post_handler(callback: types.CallbackQuery):
 # ============= BACK TO LIST =============
 
 
-@router.callback_query(F.data == "back_to_list")
+@callbacks(cb.BackToList)
 async def back_to_list(callback: types.CallbackQuery):
     """
     Возвращаемся к первой странице списка запланированных постов.
     """
-    offset = 0
-    posts = await get_pending_posts_page(PAGE_SIZE, offset)
+    posts = await pending_page(PAGE_SIZE)
 
     if not posts:
         await callback.message.answer("У тебя нет запланированных постов 💤")
         await callback.answer()
         return
 
-    kb = build_posts_list_kb(posts, page=1, page_size=PAGE_SIZE)
+    total = await pending_count()
+    kb = build_posts_list_kb(posts, page=1, page_size=PAGE_SIZE, total=total)
     await callback.message.answer("Вот твои запланированные посты:", reply_markup=kb)
     await callback.answer()
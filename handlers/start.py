@@ -1,10 +1,10 @@
 from aiogram import Router, types
 from aiogram.filters import Command
 from keyboards.main_menu import admin_menu
+from middlewares.throttling import throttling
 
 router = Router()
-
-ADMIN_ID = [8120213148, 882428172]  # теперь список, но имя то же!
+router.message.middleware(throttling)
 
 
 def register_start_handlers(dp):
@@ -12,8 +12,8 @@ def register_start_handlers(dp):
 
 
 @router.message(Command("start"))
-async def cmd_start(message: types.Message):
-    if message.from_user.id in ADMIN_ID:  # <<< вот это единственное важное изменение
+async def cmd_start(message: types.Message, is_admin: bool = False):
+    if is_admin:  # проставляет AdminGateMiddleware
         await message.answer(
             "Приветствую, Ирина! 😊\nВыбери действие:", reply_markup=admin_menu()
         )
@@ -1,8 +1,10 @@
 from aiogram import Router, types, F
 
-router = Router()
+from middlewares.throttling import throttling
+from utils.publisher import rate_limiter
 
-ADMIN_ID = [8120213148, 882428172]  # тот же ID, что и в admin.py
+router = Router()
+router.message.middleware(throttling)
 
 
 def register_user_handlers(dp):
@@ -10,9 +12,14 @@ def register_user_handlers(dp):
 
 
 @router.message(F.text)
-async def echo(message: types.Message):
+async def echo(message: types.Message, is_admin: bool = False):
     # не мешаем админу работать с ботом
-    if message.from_user.id == ADMIN_ID:
+    if is_admin:
+        return
+
+    # эхо — в последнюю очередь: только из свободного бюджета API,
+    # публикации по расписанию его не ждут
+    if not rate_limiter.try_acquire_low():
         return
 
     await message.answer(f"Ты написал: {message.text}")
@@ -1,8 +1,12 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from datetime import date, datetime
+from functools import lru_cache
 import calendar
 import pytz
 
+from config import CALENDAR_LOCALE, CALENDAR_PRECOMPUTE_MONTHS
+from keyboards import callbacks as cb
+
 LA = pytz.timezone("America/New_York")
 
 HOLIDAYS = {
@@ -21,96 +25,180 @@ WEEKEND_EMOJI = "🟢"
 def build_date_choice_kb() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="📅 Сегодня", callback_data="pick_date:today")],
             [
                 InlineKeyboardButton(
-                    text="📆 Завтра", callback_data="pick_date:tomorrow"
+                    text="📅 Сегодня", callback_data=cb.QuickDate(days=0).pack()
+                )
+            ],
+            [
+                InlineKeyboardButton(
+                    text="📆 Завтра", callback_data=cb.QuickDate(days=1).pack()
                 )
             ],
             [
                 InlineKeyboardButton(
-                    text="🗓 Через 2 дня", callback_data="pick_date:after2"
+                    text="🗓 Через 2 дня", callback_data=cb.QuickDate(days=2).pack()
                 )
             ],
             [
                 InlineKeyboardButton(
-                    text="📖 Открыть календарь", callback_data="open_calendar"
+                    text="📖 Открыть календарь",
+                    callback_data=cb.OpenCalendar().pack(),
                 )
             ],
         ]
     )
 
 
-def build_calendar(year: int, month: int) -> InlineKeyboardMarkup:
-    today = datetime.now(LA).date()
-    kb = InlineKeyboardMarkup(inline_keyboard=[])
-
-    # HEADER
-    kb.inline_keyboard.append(
-        [
-            InlineKeyboardButton(
-                text="«", callback_data=f"calendar_prev:{year}:{month}"
-            ),
-            InlineKeyboardButton(
-                text=f"{calendar.month_name[month]} {year}", callback_data="ignore"
-            ),
-            InlineKeyboardButton(
-                text="»", callback_data=f"calendar_next:{year}:{month}"
-            ),
-        ]
+# ==========================================
+#            CALENDAR
+# ==========================================
+
+MONTH_NAMES = {
+    "ru": (
+        "", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+        "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
+    ),
+    "en": tuple(calendar.month_name),
+}
+
+WEEKDAY_NAMES = {
+    "ru": ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"),
+    "en": ("Mo", "Tu", "We", "Th", "Fr", "Sa", "Su"),
+}
+
+BACK_TEXT = {"ru": "⬅ Назад", "en": "⬅ Back"}
+
+# Кнопки — обычные объекты aiogram, но после сборки их никто не меняет,
+# поэтому одни и те же ряды переиспользуются во всех клавиатурах:
+# на клик «/» остаётся только собрать разметку из готовых рядов.
+Row = tuple[InlineKeyboardButton, ...]
+
+NOOP = cb.Noop().pack()
+
+EMPTY_BUTTON = InlineKeyboardButton(text=" ", callback_data=NOOP)
+
+
+@lru_cache(maxsize=None)
+def _weekday_row(locale: str) -> Row:
+    return tuple(
+        InlineKeyboardButton(text=name, callback_data=NOOP)
+        for name in WEEKDAY_NAMES[locale]
     )
 
-    kb.inline_keyboard.append(
-        [
-            InlineKeyboardButton(text="Пн", callback_data="ignore"),
-            InlineKeyboardButton(text="Вт", callback_data="ignore"),
-            InlineKeyboardButton(text="Ср", callback_data="ignore"),
-            InlineKeyboardButton(text="Чт", callback_data="ignore"),
-            InlineKeyboardButton(text="Пт", callback_data="ignore"),
-            InlineKeyboardButton(text="Сб", callback_data="ignore"),
-            InlineKeyboardButton(text="Вс", callback_data="ignore"),
-        ]
+
+@lru_cache(maxsize=None)
+def _footer_row(locale: str) -> Row:
+    back = InlineKeyboardButton(
+        text=BACK_TEXT[locale], callback_data=cb.CalendarClose().pack()
+    )
+    return (back,)
+
+
+@lru_cache(maxsize=1024)
+def _day_button(d: date, today: date, load: int = 0) -> InlineKeyboardButton:
+    # disable past
+    if d < today:
+        return InlineKeyboardButton(text=f"·{d.day}·", callback_data=NOOP)
+
+    # emoji
+    mmdd = f"{d.month:02d}-{d.day:02d}"
+    emoji = ""
+    if d == today:
+        emoji = TODAY_EMOJI
+    elif mmdd in HOLIDAYS:
+        emoji = HOLIDAYS[mmdd]
+    elif d.weekday() >= 5:
+        emoji = WEEKEND_EMOJI
+
+    # сколько постов на этот день уже запланировано
+    text = f"{emoji} {d.day} ({load})" if load else f"{emoji} {d.day}"
+    return InlineKeyboardButton(
+        text=text, callback_data=cb.CalendarPick(day=d.toordinal()).pack()
     )
 
-    # DAYS
-    for week in calendar.monthcalendar(year, month):
-        row = []
-        for day in week:
-            if day == 0:
-                row.append(InlineKeyboardButton(text=" ", callback_data="ignore"))
-                continue
-
-            d = date(year, month, day)
-            mmdd = d.strftime("%m-%d")
-
-            # disable past
-            if d < today:
-                row.append(
-                    InlineKeyboardButton(text=f"·{day}·", callback_data="ignore")
-                )
-                continue
-
-            # emoji
-            emoji = ""
-            if d == today:
-                emoji = TODAY_EMOJI
-            elif mmdd in HOLIDAYS:
-                emoji = HOLIDAYS[mmdd]
-            elif d.weekday() >= 5:
-                emoji = WEEKEND_EMOJI
-
-            row.append(
-                InlineKeyboardButton(
-                    text=f"{emoji} {day}",
-                    callback_data=f"calendar_pick:{d.strftime('%Y-%m-%d')}",
-                )
-            )
 
-        kb.inline_keyboard.append(row)
+@lru_cache(maxsize=64)
+def _month_weeks(year: int, month: int) -> tuple[tuple[int, ...], ...]:
+    return tuple(tuple(week) for week in calendar.monthcalendar(year, month))
+
+
+@lru_cache(maxsize=64)
+def _month_rows(year: int, month: int, today: date, locale: str) -> tuple[Row, ...]:
+    """
+    Все ряды клавиатуры месяца. today входит в ключ, поэтому после
+    полуночи кэш сам начинает отдавать новые сетки, а старые вытесняются.
+    """
+    prev_year, prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    header = (
+        InlineKeyboardButton(
+            text="«",
+            callback_data=cb.CalendarMonth(year=prev_year, month=prev_month).pack(),
+        ),
+        InlineKeyboardButton(
+            text=f"{MONTH_NAMES[locale][month]} {year}", callback_data=NOOP
+        ),
+        InlineKeyboardButton(
+            text="»",
+            callback_data=cb.CalendarMonth(year=next_year, month=next_month).pack(),
+        ),
+    )
 
-    # FOOTER
-    kb.inline_keyboard.append(
-        [InlineKeyboardButton(text="⬅ Назад", callback_data="calendar_close")]
+    weeks = tuple(
+        tuple(
+            EMPTY_BUTTON if day == 0 else _day_button(date(year, month, day), today)
+            for day in week
+        )
+        for week in _month_weeks(year, month)
     )
 
-    return kb
+    return (header, _weekday_row(locale), *weeks, _footer_row(locale))
+
+
+def _today() -> date:
+    return datetime.now(LA).date()
+
+
+def _locale(locale: str) -> str:
+    return locale if locale in MONTH_NAMES else "ru"
+
+
+def build_calendar(
+    year: int,
+    month: int,
+    locale: str = CALENDAR_LOCALE,
+    load: tuple[int, ...] = (),
+) -> InlineKeyboardMarkup:
+    """
+    load — сколько постов на каждый день месяца (индекс — день - 1),
+    см. utils.post_index.day_load. Дни с постами получают подпись «15 (2)»:
+    их кнопки подставляются поверх закэшированной сетки.
+    """
+    today = _today()
+    rows = _month_rows(year, month, today, _locale(locale))
+    keyboard = [list(row) for row in rows]
+
+    if any(load):
+        for i, week in enumerate(_month_weeks(year, month)):
+            for j, day in enumerate(week):
+                if day and load[day - 1]:
+                    d = date(year, month, day)
+                    keyboard[2 + i][j] = _day_button(d, today, load[day - 1])
+
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+def precompute_calendars(months: int = CALENDAR_PRECOMPUTE_MONTHS):
+    """
+    Собирает текущий и следующие months месяцев, чтобы первое же
+    листание календаря попадало в кэш. Вызывается после старта и в
+    полночь: сетки прошедшего дня выбрасываются целиком.
+    """
+    _month_rows.cache_clear()
+    today = _today()
+    locale = _locale(CALENDAR_LOCALE)
+    year, month = today.year, today.month
+    for _ in range(months + 1):
+        _month_rows(year, month, today, locale)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
@@ -0,0 +1,138 @@
+from aiogram.filters.callback_data import CallbackData
+from pydantic import BaseModel
+
+# Все callback_data бота. Префиксы короткие (в Telegram на callback_data
+# всего 64 байта), поля типизированы: хендлер получает уже разобранный
+# объект, без split(":"). Префиксы должны быть уникальны — по ним
+# utils/callback_router.py находит хендлер.
+
+
+class Noop(CallbackData, prefix="-"):
+    """
+    Кнопка-надпись (заголовки календаря, «стр. X/Y»).
+    """
+
+
+# ==========================================
+#            СОЗДАНИЕ ПОСТА
+# ==========================================
+
+
+class TargetToggle(CallbackData, prefix="tt"):
+    index: int  # индекс канала в CHANNEL_IDS
+
+
+class TargetDone(CallbackData, prefix="td"):
+    pass
+
+
+class PublishNow(CallbackData, prefix="an"):
+    pass
+
+
+class Schedule(CallbackData, prefix="as"):
+    pass
+
+
+class ScheduleRepeat(CallbackData, prefix="ar"):
+    pass
+
+
+class CancelPost(CallbackData, prefix="ac"):
+    pass
+
+
+class RepeatPreset(CallbackData, prefix="rp"):
+    key: str  # ключ REPEAT_PRESETS
+
+
+# ==========================================
+#            ДАТА И КАЛЕНДАРЬ
+# ==========================================
+
+
+class QuickDate(CallbackData, prefix="qd"):
+    days: int  # сколько дней от сегодня
+
+
+class OpenCalendar(CallbackData, prefix="oc"):
+    pass
+
+
+class CalendarMonth(CallbackData, prefix="cm"):
+    year: int
+    month: int
+
+
+class CalendarPick(CallbackData, prefix="cp"):
+    day: int  # date.toordinal()
+
+
+class CalendarClose(CallbackData, prefix="cc"):
+    pass
+
+
+# ==========================================
+#            СПИСОК И УПРАВЛЕНИЕ ПОСТОМ
+# ==========================================
+
+
+class PostsPage(CallbackData, prefix="pp"):
+    """
+    Курсор списка: ключ (publish_ts, id) крайнего поста текущей страницы;
+    before — листаем назад.
+    """
+
+    page: int
+    before: bool
+    ts: int
+    id: int
+
+
+class OpenPost(CallbackData, prefix="po"):
+    id: int
+    page: int
+
+
+class _PostRef(BaseModel):
+    # версия поста на момент превью: правка применится, только если
+    # с тех пор пост никто не менял
+    id: int
+    version: int | None = None
+
+
+class EditText(CallbackData, _PostRef, prefix="et"):
+    pass
+
+
+class EditMedia(CallbackData, _PostRef, prefix="em"):
+    pass
+
+
+class EditDate(CallbackData, _PostRef, prefix="ed"):
+    pass
+
+
+class EditTime(CallbackData, _PostRef, prefix="eh"):
+    pass
+
+
+class DeletePost(CallbackData, _PostRef, prefix="dp"):
+    pass
+
+
+class BackToList(CallbackData, prefix="bl"):
+    pass
+
+
+# ==========================================
+#            СЛУЖЕБНЫЕ
+# ==========================================
+
+
+class RequeueFailed(CallbackData, prefix="fr"):
+    pass
+
+
+class ResolveOverdue(CallbackData, prefix="od"):
+    publish: bool  # False — пропустить
@@ -1,6 +1,9 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardMarkup
 
+from keyboards import callbacks as cb
+from utils.timeutils import format_ts
+
 
 def _type_icon(t: str) -> str:
     mapping = {
@@ -17,29 +20,77 @@ def _type_icon(t: str) -> str:
     return mapping.get(t, "❓")
 
 
-def build_posts_list_kb(posts, page: int, page_size: int) -> InlineKeyboardMarkup:
+def build_posts_list_kb(
+    posts, page: int, page_size: int, total: int
+) -> InlineKeyboardMarkup:
     """
     Клавиатура со списком постов: каждая кнопка = один пост.
-    Пагинация: "⬅️ Назад" / "➡️ Далее".
+    Пагинация: "⬅️ Назад" / "стр. X/Y" / "➡️ Далее".
+
+    Навигация курсорная: в callback_data (cb.PostsPage) лежит ключ
+    (publish_ts, id) крайнего поста текущей страницы и направление.
     """
     builder = InlineKeyboardBuilder()
 
     for post in posts:
         t = post["type"]
         icon = _type_icon(t)
-        time_str = post["publish_time"]
+        time_str = format_ts(post["publish_ts"])
         text = f"{icon} #{post['id']} • {time_str}"
+        if post.get("rrule"):
+            text += " 🔁"
 
         builder.button(
             text=text,
-            callback_data=f"post_open:{post['id']}:{page}",
+            callback_data=cb.OpenPost(id=post["id"], page=page),
         )
 
     # Пагинация
-    if page > 1:
-        builder.button(text="⬅️ Назад", callback_data=f"posts_page:{page-1}")
-    if len(posts) == page_size:
-        builder.button(text="➡️ Далее", callback_data=f"posts_page:{page+1}")
+    pages = max(1, -(-total // page_size))
+    nav = 0
+
+    if page > 1 and posts:
+        first = posts[0]
+        builder.button(
+            text="⬅️ Назад",
+            callback_data=cb.PostsPage(
+                page=page - 1, before=True, ts=first["publish_ts"], id=first["id"]
+            ),
+        )
+        nav += 1
+
+    if pages > 1:
+        builder.button(text=f"{page}/{pages}", callback_data=cb.Noop())
+        nav += 1
+
+    if page < pages and posts:
+        last = posts[-1]
+        builder.button(
+            text="➡️ Далее",
+            callback_data=cb.PostsPage(
+                page=page + 1, before=False, ts=last["publish_ts"], id=last["id"]
+            ),
+        )
+        nav += 1
+
+    builder.adjust(*([1] * len(posts)), nav or 1)
+    return builder.as_markup()
+
+
+def build_channels_kb(channels: list[str], selected: list[int]) -> InlineKeyboardMarkup:
+    """
+    Выбор каналов для публикации: кнопка на канал (✅ — выбран)
+    и «Далее». В callback_data — индекс канала в CHANNEL_IDS.
+    """
+    builder = InlineKeyboardBuilder()
+
+    for index, channel in enumerate(channels):
+        mark = "✅" if index in selected else "▫️"
+        builder.button(
+            text=f"{mark} {channel}", callback_data=cb.TargetToggle(index=index)
+        )
+
+    builder.button(text="➡️ Далее", callback_data=cb.TargetDone())
 
     builder.adjust(1)
     return builder.as_markup()
@@ -0,0 +1,53 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.types import TelegramObject, Update, User
+
+from config import ADMIN_IDS
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class AdminGateMiddleware(BaseMiddleware):
+    """
+    Первая проверка апдейта: пишет ли админ. Кладёт data["is_admin"].
+
+    Регистрируется на dp.update вместо FSM-middleware, которое оборачивает
+    (Dispatcher создаётся с disable_fsm=True): состояние из хранилища
+    читается только для админов — все диалоги бота админские. Обычные
+    пользователи идут в роутеры сразу, без обращения к хранилищу, а их
+    нажатия кнопок (все inline-кнопки — админские) отбрасываются, не
+    доходя до фильтров. Апдейты без пользователя (посты каналов и т.п.)
+    проходят как раньше.
+    """
+
+    def __init__(
+        self, fsm: FSMContextMiddleware, admin_ids: frozenset[int] = ADMIN_IDS
+    ):
+        self.fsm = fsm
+        self.admin_ids = admin_ids
+
+    async def __call__(
+        self, handler: Handler, event: Update, data: dict[str, Any]
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is None:
+            return await self.fsm(handler, event, data)
+
+        if user.id in self.admin_ids:
+            data["is_admin"] = True
+            return await self.fsm(handler, event, data)
+
+        if event.message is None:
+            return None
+
+        data["is_admin"] = False
+        return await handler(event, data)
+
+
+async def admin_only(event: TelegramObject, is_admin: bool = False) -> bool:
+    """
+    Фильтр уровня роутера: router.message.filter(admin_only).
+    """
+    return is_admin
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import Message
+
+from config import ALBUM_LATENCY_SECONDS, MULTI_PROCESS
+from utils.db import add_album_part, get_album_last_part_at, take_album
+
+Handler = Callable[[Message, dict[str, Any]], Awaitable[Any]]
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """
+    Собирает сообщения одного альбома (media_group_id) в один вызов
+    хендлера: data["album"] — список сообщений по порядку.
+
+    Telegram присылает альбом отдельными апдейтами. Первое сообщение
+    группы ждёт, пока latency секунд не придёт новых элементов
+    (таймер сбрасывается на каждом), и только тогда идёт в хендлер;
+    остальные лишь дописываются в буфер и дальше не передаются.
+
+    Один процесс — буфер в памяти. При shared (MULTI_PROCESS: webhook-
+    процессы за балансировщиком) элементы одного альбома приходят
+    в разные процессы, поэтому каждый пишется в album_parts, а альбом
+    целиком забирает тот процесс, который первым дождался тишины.
+    """
+
+    def __init__(
+        self, latency: float = ALBUM_LATENCY_SECONDS, shared: bool = MULTI_PROCESS
+    ):
+        self.latency = latency
+        self.shared = shared
+        self._albums: dict[tuple[int, str], list[Message]] = {}
+        self._touched: dict[tuple[int, str], asyncio.Event] = {}
+
+    async def __call__(
+        self, handler: Handler, event: Message, data: dict[str, Any]
+    ) -> Any:
+        if not event.media_group_id:
+            return await handler(event, data)
+
+        key = (event.chat.id, event.media_group_id)
+
+        if self.shared:
+            await add_album_part(
+                *key, event.message_id, event.model_dump_json(exclude_none=True)
+            )
+
+        if key in self._albums:
+            self._albums[key].append(event)
+            self._touched[key].set()
+            return None
+
+        self._albums[key] = [event]
+        self._touched[key] = touched = asyncio.Event()
+        try:
+            # debounce: ждём тишины в latency секунд
+            while True:
+                touched.clear()
+                try:
+                    await asyncio.wait_for(touched.wait(), self.latency)
+                except asyncio.TimeoutError:
+                    break
+            if self.shared:
+                album = await self._take_shared(key, data["bot"])
+            else:
+                album = self._albums[key]
+        finally:
+            self._albums.pop(key)
+            del self._touched[key]
+
+        if not album:
+            return None  # альбом забрал другой процесс
+
+        album.sort(key=lambda message: message.message_id)
+        data["album"] = album
+        return await handler(album[0], data)
+
+    async def _take_shared(self, key: tuple[int, str], bot: Bot) -> list[Message]:
+        # тишина должна быть во всех процессах: ждём latency после
+        # последнего элемента, записанного кем угодно
+        while True:
+            last = await get_album_last_part_at(*key)
+            if last is None:
+                return []
+            delay = last + self.latency - time.time()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        return [
+            Message.model_validate_json(message).as_(bot)
+            for message in await take_album(*key)
+        ]
@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, User
+
+from config import THROTTLE_BURST, THROTTLE_RATE
+
+Handler = Callable[[Message, dict[str, Any]], Awaitable[Any]]
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Анти-флуд: у пользователя ведро на burst сообщений, rate в секунду;
+    лишнее отбрасывается молча, админов не ограничивает. Экземпляр
+    один на все роутеры (throttling) — лимит общий.
+    """
+
+    def __init__(self, rate: float = THROTTLE_RATE, burst: float = THROTTLE_BURST):
+        if rate <= 0 or burst < 1:
+            raise ValueError(
+                f"throttling needs rate > 0 and burst >= 1, got {rate=} {burst=}"
+            )
+        self.rate = rate
+        self.burst = burst
+        # через ttl секунд тишины ведро снова полное — запись можно выбросить
+        self.ttl = burst / rate
+        # (токены, время) по порядку последнего сообщения: давние — в начале
+        self._buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, user_id: int) -> bool:
+        now = time.monotonic()
+        self._evict(now)
+
+        tokens, updated = self._buckets.pop(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        self._buckets[user_id] = (tokens, now)  # в конец — самый свежий
+        return allowed
+
+    def _evict(self, now: float):
+        while self._buckets:
+            user_id, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < self.ttl:
+                return
+            del self._buckets[user_id]
+
+    async def __call__(
+        self, handler: Handler, event: Message, data: dict[str, Any]
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if data.get("is_admin") or user is None or self.allow(user.id):
+            return await handler(event, data)
+        return None
+
+
+# общий для всех роутеров с сообщениями обычных пользователей
+throttling = ThrottlingMiddleware()
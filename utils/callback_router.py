@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from aiogram import Router
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery
+
+# хендлер без фильтра по состоянию FSM — для любого состояния
+ANY_STATE = "*"
+SEPARATOR = ":"
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    data_cls: type[CallbackData]
+    handler: CallableObject
+
+
+class CallbackRouter:
+    """
+    Диспетчер callback-кнопок по префиксу CallbackData.
+
+    Вместо цепочки F.data.startswith(...) на роутер aiogram вешается один
+    хендлер: префикс отрезается от callback_data, хендлер находится по
+    словарю {prefix: {state: route}} — два dict-поиска при любом числе
+    кнопок, — а данные разбираются один раз в объект нужного класса
+    и передаются хендлеру как callback_data.
+
+    Если подходящего хендлера нет (чужой префикс, другое состояние FSM,
+    битая кнопка), апдейт уходит дальше — к следующим роутерам.
+
+        callbacks = CallbackRouter()
+
+        @callbacks(cb.OpenPost)
+        async def open_post(callback, callback_data: cb.OpenPost): ...
+
+        callbacks.attach(router)
+    """
+
+    def __init__(self):
+        self._routes: dict[str, dict[str, Route]] = {}
+
+    def __call__(
+        self, data_cls: type[CallbackData], state: State | None = None
+    ) -> Callable:
+        def decorator(handler: Callable) -> Callable:
+            self.register(handler, data_cls, state)
+            return handler
+
+        return decorator
+
+    def register(
+        self,
+        handler: Callable,
+        data_cls: type[CallbackData],
+        state: State | None = None,
+    ):
+        if data_cls.__separator__ != SEPARATOR:
+            raise ValueError(f"{data_cls.__name__}: separator must be {SEPARATOR!r}")
+
+        routes = self._routes.setdefault(data_cls.__prefix__, {})
+        key = state.state if state is not None else ANY_STATE
+        if key in routes:
+            raise ValueError(f"{data_cls.__name__}: duplicate handler for {key}")
+        routes[key] = Route(data_cls, CallableObject(handler))
+
+    def resolve(
+        self, data: str, raw_state: str | None = None
+    ) -> tuple[Route, CallbackData] | None:
+        """
+        Хендлер и разобранные данные для callback_data — или None.
+        """
+        routes = self._routes.get(data.partition(SEPARATOR)[0])
+        if routes is None:
+            return None
+
+        route = routes.get(raw_state) or routes.get(ANY_STATE)
+        if route is None:
+            return None
+
+        try:
+            return route, route.data_cls.unpack(data)
+        except (TypeError, ValueError):
+            return None  # кнопка старого формата или подделанные данные
+
+    async def dispatch(
+        self, callback: CallbackQuery, raw_state: str | None = None, **data: Any
+    ) -> Any:
+        match = self.resolve(callback.data or "", raw_state)
+        if match is None:
+            raise SkipHandler()
+
+        route, callback_data = match
+        return await route.handler.call(
+            callback, callback_data=callback_data, raw_state=raw_state, **data
+        )
+
+    def attach(self, router: Router):
+        router.callback_query.register(self.dispatch)
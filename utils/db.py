@@ -1,5 +1,134 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Callable
+
 import aiosqlite
-from config import DB_PATH
+from config import DB_PATH, DB_POOL_SIZE
+from utils.timeutils import now_ts
+
+
+# ============================
+#       CONNECTION POOL
+# ============================
+
+# Применяются к каждому соединению пула сразу после открытия.
+_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",  # читатели не блокируют писателя
+    "PRAGMA synchronous = NORMAL",  # в WAL этого достаточно для надёжности
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",  # ~16 МБ страничного кэша
+)
+
+
+class DatabasePool:
+    """
+    Долгоживущие соединения с SQLite: один писатель + N читателей.
+
+    Писатель один — SQLite всё равно сериализует запись, а общий lock
+    избавляет от SQLITE_BUSY внутри процесса. Читатели в режиме WAL
+    работают параллельно с писателем.
+    """
+
+    def __init__(self, path: str, readers: int):
+        self.path = path
+        self.readers_count = max(1, readers)
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._all_readers: list[aiosqlite.Connection] = []
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+
+    async def _connect(self, read_only: bool) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.path)
+        conn.row_factory = aiosqlite.Row
+
+        for pragma in _PRAGMAS:
+            await conn.execute(pragma)
+        if read_only:
+            await conn.execute("PRAGMA query_only = ON")
+
+        return conn
+
+    async def open(self):
+        # писатель первым: он переводит файл в WAL
+        self._writer = await self._connect(read_only=False)
+
+        for _ in range(self.readers_count):
+            conn = await self._connect(read_only=True)
+            self._all_readers.append(conn)
+            self._readers.put_nowait(conn)
+
+    async def close(self):
+        # дожидаемся текущей записи, чтобы не оборвать транзакцию
+        async with self._write_lock:
+            for conn in self._all_readers:
+                await conn.close()
+            self._all_readers.clear()
+            self._readers = asyncio.Queue()
+
+            if self._writer is not None:
+                await self._writer.close()
+                self._writer = None
+
+    @asynccontextmanager
+    async def read(self):
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def write(self):
+        """
+        Транзакция на писателе: commit при успехе, rollback при ошибке.
+        """
+        async with self._write_lock:
+            try:
+                yield self._writer
+                await self._writer.commit()
+            except BaseException:
+                await self._writer.rollback()
+                raise
+
+
+_pool: DatabasePool | None = None
+
+
+def get_pool() -> DatabasePool:
+    if _pool is None:
+        raise RuntimeError("DB pool is not initialized, call init_db() first")
+    return _pool
+
+
+# ============================
+#       CHANGE LISTENERS
+# ============================
+
+# Вызываются после каждого изменения поста (создание, правка, смена
+# статуса, удаление) с post_id и строкой поста после изменения (None —
+# пост удалён). Так кэши и индексы в памяти процесса остаются в актуальном
+# состоянии без перечитывания базы.
+PostListener = Callable[[int, dict | None], None]
+_post_listeners: list[PostListener] = []
+
+
+def add_post_listener(listener: PostListener):
+    _post_listeners.append(listener)
+
+
+def _notify_post_changed(post_id: int, row: dict | None):
+    for listener in _post_listeners:
+        listener(post_id, row)
+
+
+def _notify_rows(rows) -> list[dict]:
+    posts = [dict(r) for r in rows]
+    for post in posts:
+        _notify_post_changed(post["id"], post)
+    return posts
 
 
 # ============================
@@ -8,7 +137,17 @@ from config import DB_PATH
 
 
 async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
+    """
+    Открывает пул соединений (один раз на процесс) и создаёт таблицы.
+    """
+    global _pool
+
+    if _pool is None:
+        pool = DatabasePool(DB_PATH, DB_POOL_SIZE)
+        await pool.open()
+        _pool = pool
+
+    async with _pool.write() as db:
         await db.execute(
             """
             CREATE TABLE IF NOT EXISTS posts (
@@ -16,12 +155,176 @@ async def init_db():
                 type TEXT NOT NULL,
                 content TEXT NOT NULL,        -- текст или JSON
                 channel_id TEXT NOT NULL,
-                publish_time TEXT NOT NULL,   -- ISO-строка
-                status TEXT DEFAULT 'pending' -- pending / sent
+                publish_time TEXT NOT NULL,   -- ISO-строка (UTC), только для истории
+                status TEXT DEFAULT 'pending', -- см. «жизненный цикл» ниже
+                publish_ts INTEGER,           -- UTC epoch, по нему всё работает
+                claimed_by TEXT,              -- кто публикует (status = claimed)
+                lease_until INTEGER,          -- до какого момента действует захват
+                attempts INTEGER NOT NULL DEFAULT 0, -- неудачных попыток подряд
+                last_error TEXT,              -- последняя ошибка публикации
+                rrule TEXT,                   -- правило повтора (utils/recurrence.py)
+                rrule_anchor_ts INTEGER,      -- начало серии: от него считается повтор
+                version INTEGER NOT NULL DEFAULT 1 -- растёт при каждой правке
+            )
+            """
+        )
+        await _ensure_column(db, "posts", "publish_ts", "INTEGER")
+        await _ensure_column(db, "posts", "claimed_by", "TEXT")
+        await _ensure_column(db, "posts", "lease_until", "INTEGER")
+        await _ensure_column(db, "posts", "attempts", "INTEGER NOT NULL DEFAULT 0")
+        await _ensure_column(db, "posts", "last_error", "TEXT")
+        await _ensure_column(db, "posts", "rrule", "TEXT")
+        await _ensure_column(db, "posts", "version", "INTEGER NOT NULL DEFAULT 1")
+        await _ensure_column(db, "posts", "rrule_anchor_ts", "INTEGER")
+        # серии, созданные до rrule_anchor_ts: считаем от текущего вхождения
+        await db.execute(
+            """
+            UPDATE posts SET rrule_anchor_ts = publish_ts
+            WHERE rrule IS NOT NULL AND rrule_anchor_ts IS NULL
+            """
+        )
+
+        # dead letter: посты, которые так и не удалось опубликовать
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS failed_posts (
+                post_id INTEGER PRIMARY KEY,
+                error TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                failed_at INTEGER NOT NULL    -- UTC epoch
+            )
+            """
+        )
+
+        # каналы поста: один пост публикуется во все свои цели,
+        # у каждой свой статус (pending / sent / failed)
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS post_targets (
+                post_id INTEGER NOT NULL,
+                channel_id TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                sent_at INTEGER,              -- UTC epoch
+                PRIMARY KEY (post_id, channel_id)
+            )
+            """
+        )
+        # посты из времён одного канала: posts.channel_id → единственная цель
+        await db.execute(
+            """
+            INSERT OR IGNORE INTO post_targets (post_id, channel_id, status)
+            SELECT id, channel_id,
+                   CASE status WHEN 'sent' THEN 'sent' ELSE 'pending' END
+            FROM posts
+            WHERE NOT EXISTS (SELECT 1 FROM post_targets t WHERE t.post_id = posts.id)
+            """
+        )
+
+        # живые процессы планировщика: по ним делятся шарды постов
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scheduler_workers (
+                worker_id TEXT PRIMARY KEY,
+                heartbeat INTEGER NOT NULL    -- UTC epoch последней отметки
             )
             """
         )
-        await db.commit()
+
+        # элементы альбомов при MULTI_PROCESS (middlewares/album.py): апдейты
+        # одного альбома могут прийти в разные процессы
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS album_parts (
+                chat_id INTEGER NOT NULL,
+                media_group_id TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                message TEXT NOT NULL,        -- Message в JSON
+                received_at REAL NOT NULL,    -- UTC epoch, с долями секунды
+                PRIMARY KEY (chat_id, media_group_id, message_id)
+            )
+            """
+        )
+
+        # состояния FSM (utils/fsm_storage.py), чтобы диалоги переживали рестарт
+        await db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fsm_states (
+                key TEXT PRIMARY KEY,         -- bot:chat:user:thread:destiny
+                state TEXT,
+                data TEXT NOT NULL DEFAULT '{}',  -- JSON
+                updated_at INTEGER NOT NULL   -- UTC epoch, микросекунды
+            )
+            """
+        )
+
+    await _migrate_publish_ts()
+
+    async with _pool.write() as db:
+        # строковый индекс больше не нужен: ISO со смещением сортируется
+        # неправильно при переходе на летнее/зимнее время
+        await db.execute("DROP INDEX IF EXISTS idx_posts_status_time")
+
+        # список запланированных и выборки по времени:
+        # WHERE status = ? [AND publish_ts ...] ORDER BY publish_ts, id
+        await db.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_posts_status_ts
+            ON posts (status, publish_ts, id)
+            """
+        )
+
+
+async def _ensure_column(db, table: str, column: str, decl: str):
+    """
+    ALTER TABLE ADD COLUMN, если колонки ещё нет (миграция старых баз).
+    """
+    rows = await db.execute_fetchall(f"PRAGMA table_info({table})")
+    if column not in {r["name"] for r in rows}:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+async def _migrate_publish_ts(batch_size: int = 500):
+    """
+    Заполняет publish_ts из старой ISO-колонки publish_time.
+
+    Идёт пачками в отдельных транзакциях, чтобы не держать запись
+    надолго; строки, уже имеющие publish_ts, не трогаются.
+    """
+    while True:
+        async with get_pool().write() as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT id, publish_time FROM posts
+                WHERE publish_ts IS NULL
+                LIMIT ?
+                """,
+                (batch_size,),
+            )
+            if not rows:
+                return
+
+            await db.executemany(
+                "UPDATE posts SET publish_ts = ? WHERE id = ?",
+                [(_iso_to_ts(r["publish_time"]), r["id"]) for r in rows],
+            )
+
+
+def _iso_to_ts(value: str) -> int:
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def _ts_to_iso(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+async def close_db():
+    global _pool
+
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
 
 
 # ============================
@@ -30,24 +333,50 @@ async def init_db():
 
 
 async def save_post(
-    post_type: str, content: str, channel_id: str, publish_time: str
+    post_type: str,
+    content: str,
+    channel_ids: list[str],
+    publish_ts: int,
+    rrule: str | None = None,
 ) -> int:
     """
     content — либо TEXT, либо JSON-строка.
+    channel_ids — каналы, в которые публикуется пост (post_targets);
+    первый из них остаётся в posts.channel_id для истории.
+    publish_ts — время публикации (первого вхождения), UTC epoch.
+    rrule — правило повтора, None — разовый пост; publish_ts становится
+    началом серии (rrule_anchor_ts).
     """
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+    async with get_pool().write() as db:
+        cursor = await db.execute(
             """
-            INSERT INTO posts (type, content, channel_id, publish_time)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO posts
+                (type, content, channel_id, publish_time, publish_ts, rrule,
+                 rrule_anchor_ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            RETURNING *
             """,
-            (post_type, content, channel_id, publish_time),
+            (
+                post_type,
+                content,
+                channel_ids[0],
+                _ts_to_iso(publish_ts),
+                publish_ts,
+                rrule,
+                publish_ts if rrule else None,
+            ),
         )
-        await db.commit()
+        post = dict(await cursor.fetchone())
+        await cursor.close()
+        post_id = post["id"]
 
-        cursor = await db.execute("SELECT last_insert_rowid()")
-        row = await cursor.fetchone()
-        return row[0]  # post_id
+        await db.executemany(
+            "INSERT OR IGNORE INTO post_targets (post_id, channel_id) VALUES (?, ?)",
+            [(post_id, channel_id) for channel_id in channel_ids],
+        )
+
+    _notify_post_changed(post_id, post)
+    return post_id
 
 
 # ============================
@@ -56,11 +385,10 @@ async def save_post(
 
 
 async def get_scheduled_posts(post_id: int) -> dict | None:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-
+    async with get_pool().read() as db:
         cursor = await db.execute("SELECT * FROM posts WHERE id = ?", (post_id,))
         row = await cursor.fetchone()
+        await cursor.close()
 
         return dict(row) if row else None
 
@@ -70,59 +398,285 @@ async def get_scheduled_posts(post_id: int) -> dict | None:
 # ============================
 
 
-async def get_all_pending_posts() -> list[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-
-        cursor = await db.execute(
+async def get_pending_summaries() -> list[dict]:
+    """
+    Краткие строки всех pending-постов (без контента) — для индекса
+    в памяти (utils/post_index.py).
+    """
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
             """
-            SELECT * FROM posts
+            SELECT id, type, status, publish_ts, rrule FROM posts
             WHERE status = 'pending'
+            ORDER BY publish_ts ASC, id ASC
             """
         )
-        rows = await cursor.fetchall()
+
+        return [dict(r) for r in rows]
+
+
+async def get_pending_due_before(
+    until_ts: int,
+    shards: frozenset[int] | None = None,
+    shard_count: int = 0,
+) -> list[dict]:
+    """
+    Лёгкая выборка (id, publish_ts) pending-постов, которые должны выйти
+    не позже until_ts — окно планировщика. Читается только индекс.
+    shards — только посты с id % shard_count из этого набора
+    (None — все посты).
+    """
+    where = "status = 'pending' AND publish_ts <= ?"
+    params: list = [until_ts]
+
+    if shards is not None:
+        if not shards:
+            return []
+        placeholders = ",".join("?" * len(shards))
+        where += f" AND id % ? IN ({placeholders})"
+        params += [shard_count, *sorted(shards)]
+
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            f"""
+            SELECT id, publish_ts FROM posts
+            WHERE {where}
+            ORDER BY publish_ts ASC, id ASC
+            """,
+            params,
+        )
+
+        return [dict(r) for r in rows]
+
+
+async def get_pending_deliveries_between(start_ts: int, end_ts: int) -> list[dict]:
+    """
+    Pending-посты с publish_ts в [start_ts, end_ts] — по строке на каждый
+    ещё не отправленный канал (target_id).
+    """
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            """
+            SELECT p.*, t.channel_id AS target_id
+            FROM posts p
+            JOIN post_targets t ON t.post_id = p.id AND t.status = 'pending'
+            WHERE p.status = 'pending' AND p.publish_ts BETWEEN ? AND ?
+            ORDER BY p.publish_ts ASC, p.id ASC
+            """,
+            (start_ts, end_ts),
+        )
 
         return [dict(r) for r in rows]
 
 
+# ============================
+#     OVERDUE (RECONCILIATION)
+# ============================
+
+
+async def set_posts_status(post_ids: list[int], status: str, batch_size: int = 500):
+    """
+    Переводит pending-посты в другой статус (expired / held).
+    """
+    for i in range(0, len(post_ids), batch_size):
+        chunk = post_ids[i : i + batch_size]
+        marks = ", ".join("?" * len(chunk))
+        async with get_pool().write() as db:
+            rows = await db.execute_fetchall(
+                f"""
+                UPDATE posts SET status = ?
+                WHERE status = 'pending' AND id IN ({marks})
+                RETURNING *
+                """,
+                (status, *chunk),
+            )
+        _notify_rows(rows)
+
+
+async def get_held_posts() -> list[dict]:
+    """
+    Просроченные посты, ожидающие решения админа (status = held).
+    """
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            """
+            SELECT id, type, publish_ts FROM posts
+            WHERE status = 'held'
+            ORDER BY publish_ts ASC, id ASC
+            """
+        )
+        return [dict(r) for r in rows]
+
+
+async def release_held_posts(publish: bool) -> list[dict]:
+    """
+    Решение админа по held-постам: publish=True — вернуть в pending
+    со временем «сейчас», False — пометить expired.
+    Возвращает (id, publish_ts) затронутых постов.
+    """
+    now = now_ts()
+    async with get_pool().write() as db:
+        if publish:
+            rows = await db.execute_fetchall(
+                """
+                UPDATE posts
+                SET status = 'pending', publish_ts = ?, publish_time = ?
+                WHERE status = 'held'
+                RETURNING *
+                """,
+                (now, _ts_to_iso(now)),
+            )
+        else:
+            rows = await db.execute_fetchall(
+                """
+                UPDATE posts SET status = 'expired'
+                WHERE status = 'held'
+                RETURNING *
+                """
+            )
+
+    return _notify_rows(rows)
+
+
 # ============================
 #         UPDATE POST
 # ============================
 
 
-async def update_post(
+# Правки — одним UPDATE ... RETURNING *: строка после правки сразу
+# возвращается вызывающему (для превью), повторно читать пост не нужно.
+# None — правка не применилась: поста нет, он уже отправлен или
+# публикуется (claimed), либо версия не совпала с expected_version.
+
+
+def _editable(post_id: int, expected_version: int | None) -> tuple[str, list]:
+    # отправленный или публикуемый прямо сейчас пост не меняется
+    where = "id = ? AND status NOT IN ('claimed', 'sent')"
+    params: list = [post_id]
+
+    if expected_version is not None:
+        where += " AND version = ?"
+        params.append(expected_version)
+
+    return where, params
+
+
+async def _edit_post(
     post_id: int,
-    new_content: str | None = None,
-    new_type: str | None = None,
-    new_publish_time: str | None = None,
-):
+    assignments: str,
+    params: list,
+    expected_version: int | None,
+    condition: str = "",
+) -> dict | None:
+    where, where_params = _editable(post_id, expected_version)
+
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            f"""
+            UPDATE posts SET {assignments}, version = version + 1
+            WHERE {where} {condition}
+            RETURNING *
+            """,
+            [*params, *where_params],
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+
+    if row is None:
+        return None
+
+    post = dict(row)
+    _notify_post_changed(post_id, post)
+    return post
+
+
+async def set_post_caption(
+    post_id: int, text: str, expected_version: int | None = None
+) -> dict | None:
     """
-    Любые значения можно передавать как None — эти поля не изменятся.
+    Новый текст поста: у text-поста это весь content, у медиа и альбома —
+    поле caption внутри JSON (json_set, без разбора на стороне Python).
+    Пост с битым JSON не трогается.
     """
-    async with aiosqlite.connect(DB_PATH) as db:
-        query = "UPDATE posts SET "
-        params: list = []
+    return await _edit_post(
+        post_id,
+        """
+        content = CASE type
+            WHEN 'text' THEN ?
+            ELSE json_set(content, '$.caption', ?)
+        END
+        """,
+        [text, text],
+        expected_version,
+        "AND (type = 'text' OR json_valid(content))",
+    )
 
-        if new_content is not None:
-            query += "content = ?, "
-            params.append(new_content)
 
-        if new_type is not None:
-            query += "type = ?, "
-            params.append(new_type)
+async def replace_post_media(
+    post_id: int,
+    new_type: str,
+    new_content: str,
+    expected_version: int | None = None,
+) -> dict | None:
+    """
+    Замена одиночного медиа. Альбом так не меняется — для него None.
+    """
+    return await _edit_post(
+        post_id,
+        "type = ?, content = ?",
+        [new_type, new_content],
+        expected_version,
+        "AND type != 'media_group'",
+    )
 
-        if new_publish_time is not None:
-            query += "publish_time = ?, "
-            params.append(new_publish_time)
 
-        # убираем последний ", "
-        query = query.rstrip(", ")
+async def shift_post_time(
+    post_id: int,
+    compute_ts: Callable[[int], int],
+    expected_version: int | None = None,
+) -> dict | None:
+    """
+    Перенос времени: compute_ts получает текущий publish_ts и возвращает
+    новый (дата/время считаются в часовом поясе канала, поэтому на стороне
+    Python). Блокировка писателя — только внутри процесса, а базу могут
+    менять и другие процессы (воркеры, второй webhook), поэтому UPDATE
+    повторяет условия _editable и требует тот же publish_ts, от которого
+    считали: если пост успели изменить или захватить, правка не
+    применяется (None).
+    У повторяющегося поста новое время становится и началом серии.
+    """
+    where, where_params = _editable(post_id, expected_version)
+
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            f"SELECT publish_ts FROM posts WHERE {where}", where_params
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is None:
+            return None
+
+        old_ts = row[0]
+        new_ts = compute_ts(old_ts)
+        cursor = await db.execute(
+            f"""
+            UPDATE posts
+            SET publish_ts = ?, publish_time = ?, version = version + 1,
+                rrule_anchor_ts = CASE WHEN rrule IS NULL THEN NULL ELSE ? END
+            WHERE {where} AND publish_ts = ?
+            RETURNING *
+            """,
+            (new_ts, _ts_to_iso(new_ts), new_ts, *where_params, old_ts),
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
 
-        query += " WHERE id = ?"
-        params.append(post_id)
+    if row is None:
+        return None
 
-        await db.execute(query, params)
-        await db.commit()
+    post = dict(row)
+    _notify_post_changed(post_id, post)
+    return post
 
 
 # ============================
@@ -130,47 +684,601 @@ async def update_post(
 # ============================
 
 
-async def mark_post_as_sent(post_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+async def mark_post_as_sent(post_id: int, owner: str) -> bool:
+    """
+    claimed → sent. Срабатывает только у владельца захвата: False значит,
+    что аренда истекла и пост успел перехватить кто-то другой.
+    """
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            """
+            UPDATE posts
+            SET status = 'sent', claimed_by = NULL, lease_until = NULL
+            WHERE id = ? AND status = 'claimed' AND claimed_by = ?
+            RETURNING *
+            """,
+            (post_id, owner),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+
+    return bool(_notify_rows(rows))
+
+
+# ============================
+#      RECURRING POSTS
+# ============================
+
+
+async def get_post_rules(post_ids: list[int]) -> dict[int, tuple[str, int]]:
+    """
+    post_id → (rrule, rrule_anchor_ts) для повторяющихся постов из post_ids.
+    """
+    if not post_ids:
+        return {}
+
+    placeholders = ",".join("?" * len(post_ids))
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            f"""
+            SELECT id, rrule, rrule_anchor_ts FROM posts
+            WHERE id IN ({placeholders}) AND rrule IS NOT NULL
+            """,
+            post_ids,
+        )
+        return {r["id"]: (r["rrule"], r["rrule_anchor_ts"]) for r in rows}
+
+
+async def advance_recurring_post(
+    post_id: int, next_ts: int, owner: str | None = None
+) -> bool:
+    """
+    Переводит повторяющийся пост на следующее вхождение: та же строка
+    снова pending с новым publish_ts, счётчики и доставленные каналы
+    сброшены. Отказавшие насовсем каналы остаются failed — до
+    перезапуска из /failed (requeue_failed_posts). Начало серии
+    (rrule_anchor_ts) не меняется.
+    owner — после публикации (пост захвачен этим воркером);
+    None — пропуск просроченного pending-вхождения.
+    """
+    if owner is None:
+        condition, params = "status = 'pending'", ()
+    else:
+        condition, params = "status = 'claimed' AND claimed_by = ?", (owner,)
+
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            f"""
+            UPDATE posts
+            SET status = 'pending', claimed_by = NULL, lease_until = NULL,
+                attempts = 0, last_error = NULL, version = version + 1,
+                publish_ts = ?, publish_time = ?
+            WHERE id = ? AND {condition}
+            RETURNING *
+            """,
+            (next_ts, _ts_to_iso(next_ts), post_id, *params),
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is None:
+            return False
+
         await db.execute(
-            "UPDATE posts SET status = 'sent' WHERE id = ?",
+            """
+            UPDATE post_targets
+            SET status = 'pending', attempts = 0, last_error = NULL
+            WHERE post_id = ? AND status = 'sent'
+            """,
             (post_id,),
         )
-        await db.commit()
+
+    _notify_post_changed(post_id, dict(row))
+    return True
 
 
 # ============================
-#         DELETE POST
+#      TARGETS (FAN-OUT)
 # ============================
 
 
-async def delete_post(post_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("DELETE FROM posts WHERE id = ?", (post_id,))
-        await db.commit()
+async def get_post_targets(post_id: int) -> list[dict]:
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            "SELECT * FROM post_targets WHERE post_id = ? ORDER BY channel_id",
+            (post_id,),
+        )
+        return [dict(r) for r in rows]
+
+
+async def mark_target_sent(post_id: int, channel_id: str):
+    async with get_pool().write() as db:
+        await db.execute(
+            """
+            UPDATE post_targets
+            SET status = 'sent', last_error = NULL, sent_at = ?
+            WHERE post_id = ? AND channel_id = ?
+            """,
+            (now_ts(), post_id, channel_id),
+        )
+
+
+async def mark_target_failed(
+    post_id: int, channel_id: str, error: str, permanent: bool
+):
+    """
+    Ошибка отправки в один канал. permanent — канал выходит из рассылки
+    (failed), иначе остаётся pending до следующей попытки поста.
+    """
+    async with get_pool().write() as db:
+        await db.execute(
+            """
+            UPDATE post_targets
+            SET attempts = attempts + 1, last_error = ?,
+                status = CASE WHEN ? THEN 'failed' ELSE status END
+            WHERE post_id = ? AND channel_id = ?
+            """,
+            (error, permanent, post_id, channel_id),
+        )
 
 
 # ============================
-#     PAGINATION (PENDING)
+#      OUTBOX: CLAIM / LEASE
 # ============================
 
+# Жизненный цикл поста: pending → claimed (claimed_by, lease_until) → sent.
+# Кроме того: failed — dead letter, held — просрочен и ждёт решения
+# админа, expired — просрочен и больше не публикуется.
+# Публикует только тот, кто атомарно захватил строку, поэтому два
+# срабатывания одного поста (в одном или разных процессах) не дублируют
+# отправку. Пока идёт рассылка, захват продлевается (renew_lease);
+# при остановке процесс отдаёт свои захваты (release_claims), а если
+# процесс упал, аренда истекает и пост возвращается в pending
+# (recover_expired_leases).
+
 
-async def get_pending_posts_page(limit: int, offset: int) -> list[dict]:
+async def claim_post(post_id: int, owner: str, lease_seconds: int) -> dict | None:
     """
-    Возвращает страницу запланированных (pending) постов.
+    Атомарно захватывает пост, время которого уже наступило.
+    Возвращает строку поста или None, если захватить нельзя: пост
+    отправлен/удалён, его держит другой воркер или он ещё не due.
+    """
+    now = now_ts()
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            """
+            UPDATE posts
+            SET status = 'claimed', claimed_by = ?, lease_until = ?
+            WHERE id = ?
+              AND publish_ts <= ?
+              AND (status = 'pending' OR (status = 'claimed' AND lease_until < ?))
+            RETURNING *
+            """,
+            (owner, now + lease_seconds, post_id, now + 1, now),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+
+    posts = _notify_rows(rows)
+    return posts[0] if posts else None
+
+
+async def release_post(post_id: int, owner: str, error: str) -> int | None:
+    """
+    Публикация не удалась — отдаём пост обратно в pending
+    и увеличиваем счётчик попыток. Возвращает новое число попыток
+    (None, если захват уже не наш).
+    """
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            """
+            UPDATE posts
+            SET status = 'pending', claimed_by = NULL, lease_until = NULL,
+                attempts = attempts + 1, last_error = ?
+            WHERE id = ? AND status = 'claimed' AND claimed_by = ?
+            RETURNING *
+            """,
+            (error, post_id, owner),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+
+    posts = _notify_rows(rows)
+    return posts[0]["attempts"] if posts else None
+
+
+async def renew_lease(post_id: int, owner: str, lease_seconds: int) -> bool:
+    """
+    Продлевает захват на время долгой рассылки. False — захват уже не наш.
+    """
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            """
+            UPDATE posts SET lease_until = ?
+            WHERE id = ? AND status = 'claimed' AND claimed_by = ?
+            """,
+            (now_ts() + lease_seconds, post_id, owner),
+        )
+        return cursor.rowcount == 1
+
+
+async def release_claims(owner: str) -> int:
+    """
+    При остановке: незаконченные публикации этого воркера возвращаются
+    в pending без увеличения attempts — это не ошибка отправки.
+    Возвращает число таких постов.
     """
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            """
+            UPDATE posts
+            SET status = 'pending', claimed_by = NULL, lease_until = NULL
+            WHERE status = 'claimed' AND claimed_by = ?
+            RETURNING *
+            """,
+            (owner,),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+
+    return len(_notify_rows(rows))
+
+
+# ============================
+#      DEAD LETTER (FAILED)
+# ============================
 
+
+async def move_to_dead_letter(post_id: int, owner: str, error: str) -> bool:
+    """
+    claimed → failed + запись в failed_posts. Больше не публикуется,
+    пока админ не перезапустит (requeue_failed_posts).
+    """
+    async with get_pool().write() as db:
         cursor = await db.execute(
             """
+            UPDATE posts
+            SET status = 'failed', claimed_by = NULL, lease_until = NULL,
+                attempts = attempts + 1, last_error = ?
+            WHERE id = ? AND status = 'claimed' AND claimed_by = ?
+            RETURNING *
+            """,
+            (error, post_id, owner),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+
+        if not rows:
+            return False
+
+        await db.execute(
+            """
+            INSERT OR REPLACE INTO failed_posts (post_id, error, attempts, failed_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (post_id, error, rows[0]["attempts"], now_ts()),
+        )
+
+    _notify_rows(rows)
+    return True
+
+
+async def report_failed_targets(post_id: int, error: str, attempts: int):
+    """
+    Запись в failed_posts без смены статуса поста: повторяющийся пост
+    продолжает серию, а отказавшие каналы админ видит в /failed.
+    """
+    async with get_pool().write() as db:
+        await db.execute(
+            """
+            INSERT OR REPLACE INTO failed_posts (post_id, error, attempts, failed_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (post_id, error, attempts, now_ts()),
+        )
+
+
+async def get_failed_posts(limit: int) -> list[dict]:
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            """
+            SELECT p.id, p.type, p.publish_ts, f.error, f.attempts, f.failed_at
+            FROM failed_posts f
+            JOIN posts p ON p.id = f.post_id
+            ORDER BY f.failed_at DESC
+            LIMIT ?
+            """,
+            (limit,),
+        )
+        return [dict(r) for r in rows]
+
+
+async def count_failed_posts() -> int:
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall("SELECT COUNT(*) FROM failed_posts")
+        return rows[0][0]
+
+
+async def requeue_failed_posts() -> list[dict]:
+    """
+    Все failed → pending со сброшенным счётчиком. Просроченные посты
+    получают время «сейчас». Отказавшие каналы постов из failed_posts
+    (и повторяющихся, продолживших серию) снова в рассылке.
+    Возвращает строки для планировщика.
+    """
+    now = now_ts()
+    async with get_pool().write() as db:
+        rows = await db.execute_fetchall(
+            """
+            UPDATE posts
+            SET status = 'pending', attempts = 0, last_error = NULL,
+                publish_time = CASE WHEN publish_ts < ? THEN ? ELSE publish_time END,
+                publish_ts = MAX(publish_ts, ?)
+            WHERE status = 'failed'
+            RETURNING *
+            """,
+            (now, _ts_to_iso(now), now),
+        )
+        # повторяем только каналы, в которые пост так и не ушёл
+        await db.execute(
+            """
+            UPDATE post_targets
+            SET status = 'pending', attempts = 0, last_error = NULL
+            WHERE status = 'failed'
+              AND post_id IN (SELECT post_id FROM failed_posts)
+            """
+        )
+        await db.execute("DELETE FROM failed_posts")
+
+    return _notify_rows(rows)
+
+
+async def recover_expired_leases() -> int:
+    """
+    При старте и на каждой дочитке окна: захваты с истёкшей арендой
+    (процесс упал посреди публикации) возвращаются в pending.
+    Возвращает число таких постов.
+    """
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            """
+            UPDATE posts
+            SET status = 'pending', claimed_by = NULL, lease_until = NULL
+            WHERE status = 'claimed' AND lease_until < ?
+            RETURNING *
+            """,
+            (now_ts(),),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+
+    return len(_notify_rows(rows))
+
+
+# ============================
+#     SCHEDULER WORKERS (SHARDING)
+# ============================
+
+
+async def heartbeat_worker(worker_id: str, ttl_seconds: int) -> list[str]:
+    """
+    Продлевает жизнь воркера и вычищает тех, кто не отмечался дольше
+    ttl_seconds (упали или зависли). Возвращает отсортированный список
+    живых воркеров, включая себя, — по нему делятся шарды.
+    """
+    now = now_ts()
+    async with get_pool().write() as db:
+        await db.execute(
+            """
+            INSERT INTO scheduler_workers (worker_id, heartbeat) VALUES (?, ?)
+            ON CONFLICT (worker_id) DO UPDATE SET heartbeat = excluded.heartbeat
+            """,
+            (worker_id, now),
+        )
+        await db.execute(
+            "DELETE FROM scheduler_workers WHERE heartbeat < ?",
+            (now - ttl_seconds,),
+        )
+        rows = await db.execute_fetchall(
+            "SELECT worker_id FROM scheduler_workers ORDER BY worker_id"
+        )
+
+        return [r["worker_id"] for r in rows]
+
+
+async def remove_worker(worker_id: str):
+    """
+    При штатной остановке: шарды сразу переходят к оставшимся.
+    """
+    async with get_pool().write() as db:
+        await db.execute(
+            "DELETE FROM scheduler_workers WHERE worker_id = ?", (worker_id,)
+        )
+
+
+# ============================
+#     ALBUM PARTS (MULTI_PROCESS)
+# ============================
+
+# части, которые так никто и не забрал (процесс упал), живут не дольше
+ALBUM_PARTS_TTL_SECONDS = 3600
+
+
+async def add_album_part(
+    chat_id: int, media_group_id: str, message_id: int, message: str
+) -> float:
+    """
+    Сохраняет элемент альбома. Возвращает время получения.
+    """
+    now = time.time()
+    async with get_pool().write() as db:
+        await db.execute(
+            """
+            INSERT OR REPLACE INTO album_parts
+                (chat_id, media_group_id, message_id, message, received_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (chat_id, media_group_id, message_id, message, now),
+        )
+        await db.execute(
+            "DELETE FROM album_parts WHERE received_at < ?",
+            (now - ALBUM_PARTS_TTL_SECONDS,),
+        )
+    return now
+
+
+async def get_album_last_part_at(chat_id: int, media_group_id: str) -> float | None:
+    """
+    Когда пришёл последний элемент альбома (None — альбом уже забрали).
+    """
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            """
+            SELECT MAX(received_at) FROM album_parts
+            WHERE chat_id = ? AND media_group_id = ?
+            """,
+            (chat_id, media_group_id),
+        )
+        return rows[0][0]
+
+
+async def take_album(chat_id: int, media_group_id: str) -> list[str]:
+    """
+    Атомарно забирает все элементы альбома (JSON сообщений): из
+    нескольких процессов, дождавшихся тишины, альбом получит один.
+    """
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            """
+            DELETE FROM album_parts
+            WHERE chat_id = ? AND media_group_id = ?
+            RETURNING message
+            """,
+            (chat_id, media_group_id),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+
+    return [r["message"] for r in rows]
+
+
+# ============================
+#         DELETE POST
+# ============================
+
+
+async def delete_post(post_id: int, expected_version: int | None = None) -> bool:
+    """
+    Удаляет пост, если он не публикуется прямо сейчас (claimed) и,
+    при expected_version, не менялся. Возвращает True, если удалён.
+    """
+    query = "DELETE FROM posts WHERE id = ? AND status != 'claimed'"
+    params: list = [post_id]
+    if expected_version is not None:
+        query += " AND version = ?"
+        params.append(expected_version)
+
+    async with get_pool().write() as db:
+        cursor = await db.execute(query, params)
+        if cursor.rowcount != 1:
+            return False
+        await db.execute("DELETE FROM failed_posts WHERE post_id = ?", (post_id,))
+        await db.execute("DELETE FROM post_targets WHERE post_id = ?", (post_id,))
+
+    _notify_post_changed(post_id, None)
+    return True
+
+
+# ============================
+#     PAGINATION (PENDING)
+# ============================
+
+
+async def get_pending_posts_page(
+    limit: int,
+    after: tuple[int, int] | None = None,
+    before: tuple[int, int] | None = None,
+) -> list[dict]:
+    """
+    Возвращает страницу запланированных (pending) постов.
+
+    Keyset-пагинация по (publish_ts, id): курсор — ключ последнего (after)
+    или первого (before) поста соседней страницы. Любая страница — это
+    поиск по индексу idx_posts_status_ts + limit строк, без OFFSET.
+    Без курсора возвращается первая страница.
+    """
+    if before is not None:
+        query = """
+            SELECT *
+            FROM posts
+            WHERE status = 'pending' AND (publish_ts, id) < (?, ?)
+            ORDER BY publish_ts DESC, id DESC
+            LIMIT ?
+        """
+        params = (*before, limit)
+    elif after is not None:
+        query = """
+            SELECT *
+            FROM posts
+            WHERE status = 'pending' AND (publish_ts, id) > (?, ?)
+            ORDER BY publish_ts ASC, id ASC
+            LIMIT ?
+        """
+        params = (*after, limit)
+    else:
+        query = """
             SELECT *
             FROM posts
             WHERE status = 'pending'
-            ORDER BY publish_time ASC
-            LIMIT ? OFFSET ?
+            ORDER BY publish_ts ASC, id ASC
+            LIMIT ?
+        """
+        params = (limit,)
+
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(query, params)
+
+    posts = [dict(r) for r in rows]
+    if before is not None:
+        posts.reverse()  # читали назад — возвращаем в прямом порядке
+    return posts
+
+
+async def count_pending_by_day(bounds: list[int]) -> list[int]:
+    """
+    Сколько pending-постов в каждом интервале [bounds[i], bounds[i + 1])
+    — нагрузка по дням для календаря. Один сгруппированный запрос:
+    на каждый день — поиск диапазона в idx_posts_status_ts.
+    """
+    days = list(zip(range(len(bounds) - 1), bounds, bounds[1:]))
+    values = ", ".join("(?, ?, ?)" for _ in days)
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            f"""
+            WITH days(day, start_ts, end_ts) AS (VALUES {values})
+            SELECT days.day, COUNT(*)
+            FROM days
+            JOIN posts
+              ON posts.status = 'pending'
+             AND posts.publish_ts >= days.start_ts
+             AND posts.publish_ts < days.end_ts
+            GROUP BY days.day
             """,
-            (limit, offset),
+            [v for day in days for v in day],
         )
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+
+    counts = [0] * len(days)
+    for day, count in rows:
+        counts[day] = count
+    return counts
+
+
+async def count_pending_posts() -> int:
+    """
+    Сколько всего pending-постов (для «страница X из Y»).
+    Считается только по индексу, таблица не читается.
+    """
+    async with get_pool().read() as db:
+        rows = await db.execute_fetchall(
+            "SELECT COUNT(*) FROM posts WHERE status = 'pending'"
+        )
+        return rows[0][0]
@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable
+
+
+class HeapDispatcher:
+    """
+    Лёгкая альтернатива задачам APScheduler: один asyncio-таймер над
+    min-heap записей (due_ts, seq, post_id).
+
+    add / remove — O(log n) / O(1). Отмена и перенос ленивые: в _entries
+    хранится только актуальная запись поста, а устаревшие записи кучи
+    выбрасываются, когда всплывают наверх (или при компактизации).
+    На пост приходится один кортеж в куче и одна запись в словаре.
+    """
+
+    def __init__(self, callback: Callable[[int], Awaitable[None]]):
+        self._callback = callback
+        self._heap: list[tuple[int, int, int]] = []
+        self._entries: dict[int, tuple[int, int]] = {}  # post_id → (due_ts, seq)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, post_id: int) -> bool:
+        return post_id in self._entries
+
+    # ---------- API ----------
+
+    def add(self, post_id: int, due_ts: int):
+        """
+        Ставит пост на due_ts. Повторный вызов = перенос.
+        """
+        seq = next(self._seq)
+        self._entries[post_id] = (due_ts, seq)
+        heapq.heappush(self._heap, (due_ts, seq, post_id))
+
+        # новая запись раньше текущей вершины — таймер надо перевзвести
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+
+        self._maybe_compact()
+
+    def due(self, post_id: int) -> int | None:
+        """
+        На какой due_ts стоит пост (None — не стоит).
+        """
+        entry = self._entries.get(post_id)
+        return entry[0] if entry else None
+
+    def post_ids(self) -> list[int]:
+        return list(self._entries)
+
+    def remove(self, post_id: int):
+        self._entries.pop(post_id, None)
+        self._maybe_compact()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---------- internals ----------
+
+    def _is_live(self, item: tuple[int, int, int]) -> bool:
+        due_ts, seq, post_id = item
+        return self._entries.get(post_id) == (due_ts, seq)
+
+    def _maybe_compact(self):
+        # мёртвых записей стало заметно больше живых — пересобираем кучу
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [
+                (due_ts, seq, post_id)
+                for post_id, (due_ts, seq) in self._entries.items()
+            ]
+            heapq.heapify(self._heap)
+
+    async def _run(self):
+        while True:
+            while self._heap and not self._is_live(self._heap[0]):
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, post_id = heapq.heappop(self._heap)
+            del self._entries[post_id]
+
+            task = asyncio.create_task(self._callback(post_id))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
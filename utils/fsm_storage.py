@@ -0,0 +1,226 @@
+import asyncio
+import json
+import time
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from config import FSM_CACHE_TTL_SECONDS, FSM_FLUSH_DELAY_SECONDS, MULTI_PROCESS
+from utils.db import get_pool
+from utils.locks import KeyedLock
+from utils.logger import logger
+
+# пауза перед повтором, если запись в базу не удалась
+FLUSH_RETRY_SECONDS = 1.0
+
+
+def _key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (key.bot_id, key.chat_id, key.user_id, key.thread_id, key.destiny)
+    )
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+class _Entry:
+    __slots__ = ("state", "data", "expires", "updated")
+
+    def __init__(
+        self,
+        state: str | None,
+        data: dict[str, Any],
+        expires: float,
+        updated: int | None = None,
+    ):
+        self.state = state
+        self.data = data
+        self.expires = expires
+        self.updated = updated  # updated_at строки, из которой прочитано
+
+
+def _now_us() -> int:
+    return time.time_ns() // 1000
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM в таблице fsm_states той же базы, что и посты: незаконченные
+    диалоги (AddPost, EditText, ...) переживают рестарт.
+
+    Чтение — из кэша в памяти (запись живёт cache_ttl секунд после
+    последнего обращения). С revalidate (MULTI_PROCESS: несколько
+    вебхук-процессов за прокси) перед выдачей кэш сверяет updated_at
+    строки — поиск по первичному ключу без чтения JSON — и перечитывает
+    запись, если состояние записал другой процесс. Запись — тоже в кэш,
+    а в базу изменённые ключи уходят одним executemany через flush_delay
+    секунд: серия update_data внутри одного хендлера — одна запись.
+    """
+
+    def __init__(
+        self,
+        cache_ttl: float = FSM_CACHE_TTL_SECONDS,
+        flush_delay: float = FSM_FLUSH_DELAY_SECONDS,
+        revalidate: bool = MULTI_PROCESS,
+    ):
+        self.cache_ttl = cache_ttl
+        self.flush_delay = flush_delay
+        self.revalidate = revalidate
+        self._cache: dict[str, _Entry] = {}
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        # промахи кэша по разным ключам не ждут друг друга
+        self._load_locks = KeyedLock()
+
+    # ---------- кэш ----------
+
+    async def _entry(self, key: StorageKey) -> _Entry:
+        k = _key(key)
+        now = time.monotonic()
+
+        entry = self._cache.get(k)
+        # несброшенные изменения этого процесса новее всего, что в базе
+        if k not in self._dirty and not await self._is_fresh(k, entry, now):
+            async with self._load_locks[k]:
+                current = self._cache.get(k)
+                # пока ждали lock, запись мог перечитать соседний вызов
+                if current is entry and k not in self._dirty:
+                    current = await self._load(k)
+                    self._cache[k] = current
+                entry = current
+
+        entry.expires = now + self.cache_ttl
+        return entry
+
+    async def _is_fresh(self, k: str, entry: _Entry | None, now: float) -> bool:
+        if entry is None or entry.expires < now:
+            return False
+        if not self.revalidate:
+            return True  # один процесс: кроме него состояние никто не пишет
+
+        async with get_pool().read() as db:
+            cur = await db.execute(
+                "SELECT updated_at FROM fsm_states WHERE key = ?", (k,)
+            )
+            row = await cur.fetchone()
+
+        return (row[0] if row else None) == entry.updated
+
+    async def _load(self, k: str) -> _Entry:
+        async with get_pool().read() as db:
+            cur = await db.execute(
+                "SELECT state, data, updated_at FROM fsm_states WHERE key = ?",
+                (k,),
+            )
+            row = await cur.fetchone()
+
+        expires = time.monotonic() + self.cache_ttl
+        if row is None:
+            return _Entry(None, {}, expires)
+        return _Entry(
+            row["state"], json.loads(row["data"]), expires, row["updated_at"]
+        )
+
+    def _mark_dirty(self, k: str):
+        self._dirty.add(k)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    # ---------- запись в базу ----------
+
+    async def _flush_later(self, delay: float | None = None):
+        await asyncio.sleep(self.flush_delay if delay is None else delay)
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("FSM flush failed")
+            # ключи вернулись в _dirty — без новой попытки они ждали бы
+            # следующей записи или close()
+            self._flush_task = asyncio.create_task(
+                self._flush_later(max(self.flush_delay, FLUSH_RETRY_SECONDS))
+            )
+
+    async def flush(self):
+        """
+        Пишет все изменённые ключи одной транзакцией.
+        """
+        if not self._dirty:
+            return
+
+        keys, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+        now = _now_us()
+
+        for k in keys:
+            entry = self._cache[k]
+            if entry.state is None and not entry.data:
+                deletes.append((k,))
+            else:
+                data = json.dumps(entry.data, ensure_ascii=False)
+                upserts.append((k, entry.state, data, now))
+
+        try:
+            async with get_pool().write() as db:
+                if deletes:
+                    await db.executemany(
+                        "DELETE FROM fsm_states WHERE key = ?", deletes
+                    )
+                if upserts:
+                    await db.executemany(
+                        """
+                        INSERT INTO fsm_states (key, state, data, updated_at)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (key) DO UPDATE SET
+                            state = excluded.state,
+                            data = excluded.data,
+                            updated_at = excluded.updated_at
+                        """,
+                        upserts,
+                    )
+        except Exception:
+            # не записали — попробуем ещё раз со следующей порцией
+            self._dirty |= keys
+            raise
+
+        # кэш теперь совпадает с базой — запоминаем отметку записи
+        for k in keys:
+            entry = self._cache[k]
+            entry.updated = None if entry.state is None and not entry.data else now
+
+        self._evict(time.monotonic())
+
+    def _evict(self, now: float):
+        expired = [
+            k
+            for k, entry in self._cache.items()
+            if entry.expires < now and k not in self._dirty
+        ]
+        for k in expired:
+            del self._cache[k]
+
+    # ---------- BaseStorage ----------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._entry(key)
+        entry.state = _state_name(state)
+        self._mark_dirty(_key(key))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._entry(key)).state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        entry = await self._entry(key)
+        entry.data = data.copy()
+        self._mark_dirty(_key(key))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._entry(key)).data.copy()
+
+    async def close(self) -> None:
+        # дописываем хвост до закрытия пула
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
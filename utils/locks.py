@@ -0,0 +1,37 @@
+import asyncio
+from typing import Hashable
+from weakref import WeakValueDictionary
+
+
+class KeyedLock:
+    """
+    Отдельный asyncio.Lock на каждый ключ (post_id):
+
+        async with post_locks[post_id]:
+            ...
+
+    Замки хранятся по слабым ссылкам — запись исчезает, как только
+    замок никто не держит и не ждёт, поэтому словарь не растёт
+    с числом постов. Работа с разными постами не блокирует друг друга.
+    Защищает только внутри процесса; между процессами — захват
+    (claim_post) и версия поста (expected_version у правок в utils/db.py).
+    """
+
+    def __init__(self):
+        self._locks: WeakValueDictionary[Hashable, asyncio.Lock] = (
+            WeakValueDictionary()
+        )
+
+    def __getitem__(self, key: Hashable) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+# публикация, правка и удаление одного поста идут строго по очереди
+post_locks = KeyedLock()
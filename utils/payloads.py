@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from aiogram.methods import TelegramMethod
+
+from config import PAYLOAD_CACHE_SIZE, PAYLOAD_WARMUP_SECONDS
+from utils.db import add_post_listener, get_pending_deliveries_between
+from utils.renderer import PostPayloadError, decode_post, render
+from utils.timeutils import now_ts
+
+
+@dataclass(frozen=True, slots=True)
+class PreparedPost:
+    """
+    Готовые к отправке запросы Bot API для одного поста в один канал.
+    source — (type, content), из которых они собраны:
+    по нему кэш проверяет, что пост не меняли.
+    """
+
+    source: tuple[str, str]
+    requests: tuple[TelegramMethod, ...]
+    cost: int  # сколько сообщений спишет rate limiter
+
+
+def _source(post: dict) -> tuple[str, str]:
+    return (post["type"], post["content"])
+
+
+# ==========================================
+#            COMPILE
+# ==========================================
+
+
+def compile_post(post: dict, chat_id: str) -> PreparedPost:
+    payload = decode_post(post)
+    requests = render(payload, chat_id)
+    return PreparedPost(_source(post), requests, payload.cost)
+
+
+# ==========================================
+#            CACHE
+# ==========================================
+
+
+class PayloadCache:
+    """
+    LRU собранных постов, post_id → {channel_id → PreparedPost}.
+
+    Запись сбрасывается при правке или удалении поста (через
+    add_post_listener), а при выдаче дополнительно сверяется с
+    актуальной строкой — так правка из другого процесса тоже не
+    приведёт к отправке старой версии.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[int, dict[str, PreparedPost]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, post_id: int, chat_id: str, prepared: PreparedPost):
+        self._items.setdefault(post_id, {})[str(chat_id)] = prepared
+        self._items.move_to_end(post_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, post_id: int):
+        self._items.pop(post_id, None)
+
+    def on_post_changed(self, post_id: int, row: dict | None):
+        # смена статуса (захват, отправка) собранный пост не портит —
+        # сбрасываем только при удалении или правке контента
+        prepared = self._items.get(post_id)
+        if prepared is None:
+            return
+        if row is None or any(p.source != _source(row) for p in prepared.values()):
+            self.invalidate(post_id)
+
+    def get_or_compile(self, post: dict, chat_id: str) -> PreparedPost:
+        prepared = self._items.get(post["id"], {}).get(str(chat_id))
+        if prepared is not None and prepared.source == _source(post):
+            return prepared
+
+        prepared = compile_post(post, chat_id)
+        self.put(post["id"], chat_id, prepared)
+        return prepared
+
+
+payload_cache = PayloadCache(PAYLOAD_CACHE_SIZE)
+add_post_listener(payload_cache.on_post_changed)
+
+
+# ==========================================
+#            WARM-UP
+# ==========================================
+
+
+async def warm_up_payloads():
+    """
+    Периодически (планировщиком): заранее собирает посты, которые выходят
+    в ближайшие PAYLOAD_WARMUP_SECONDS, чтобы в момент публикации
+    оставались только захват строки и сам запрос к API.
+    """
+    now = now_ts()
+    for post in await get_pending_deliveries_between(
+        now, now + PAYLOAD_WARMUP_SECONDS
+    ):
+        try:
+            payload_cache.get_or_compile(post, post["target_id"])
+        except PostPayloadError:
+            pass  # ошибку зафиксирует сама публикация
@@ -0,0 +1,182 @@
+import calendar
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+from config import POST_INDEX_ENABLED
+from utils.db import (
+    add_post_listener,
+    count_pending_by_day,
+    count_pending_posts,
+    get_pending_posts_page,
+    get_pending_summaries,
+)
+from utils.timeutils import LA, to_ts
+
+# поля, которые нужны списку и календарю — контент в памяти не держим
+SUMMARY_FIELDS = ("id", "type", "publish_ts", "rrule")
+
+Key = tuple[int, int]  # (publish_ts, id) — тот же порядок, что в списке
+
+
+class PostIndex:
+    """
+    Отсортированный по (publish_ts, id) индекс pending-постов в памяти.
+
+    Загружается один раз при старте (load), дальше обновляется точечно
+    через add_post_listener: каждое изменение поста в utils/db.py
+    приходит сюда со строкой после изменения. Список постов и календарь
+    читают отсюда, без запросов к SQLite.
+
+    Вставка — bisect + list.insert, O(n) на сдвиг, но это memmove по
+    массиву ключей: для тысяч постов быстрее любого запроса к базе.
+    """
+
+    def __init__(self):
+        self._keys: list[Key] = []
+        self._posts: dict[int, dict] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, rows: list[dict]):
+        self._posts = {row["id"]: _summary(row) for row in rows}
+        self._keys = sorted((p["publish_ts"], p["id"]) for p in self._posts.values())
+        self.ready = True
+
+    # ---------- синхронизация ----------
+
+    def on_post_changed(self, post_id: int, row: dict | None):
+        if not self.ready:
+            return
+
+        self._discard(post_id)
+        if row is not None and row["status"] == "pending":
+            summary = _summary(row)
+            self._posts[post_id] = summary
+            insort(self._keys, (summary["publish_ts"], post_id))
+
+    def _discard(self, post_id: int):
+        old = self._posts.pop(post_id, None)
+        if old is None:
+            return
+        i = bisect_left(self._keys, (old["publish_ts"], post_id))
+        del self._keys[i]
+
+    # ---------- чтение ----------
+
+    def page(
+        self, limit: int, after: Key | None = None, before: Key | None = None
+    ) -> list[dict]:
+        """
+        Та же семантика, что у get_pending_posts_page.
+        """
+        if before is not None:
+            end = bisect_left(self._keys, before)
+            keys = self._keys[max(0, end - limit) : end]
+        elif after is not None:
+            start = bisect_right(self._keys, after)
+            keys = self._keys[start : start + limit]
+        else:
+            keys = self._keys[:limit]
+
+        return [self._posts[post_id].copy() for _, post_id in keys]
+
+    def count_between(self, start_ts: int, end_ts: int) -> int:
+        """
+        Сколько постов с publish_ts в [start_ts, end_ts) — два bisect.
+        """
+        return bisect_left(self._keys, (end_ts, -1)) - bisect_left(
+            self._keys, (start_ts, -1)
+        )
+
+
+def _summary(row: dict) -> dict:
+    return {field: row.get(field) for field in SUMMARY_FIELDS}
+
+
+post_index = PostIndex()
+add_post_listener(post_index.on_post_changed)
+
+
+async def load_post_index():
+    """
+    При старте, после init_db. С POST_INDEX_ENABLED=0 (или MULTI_PROCESS —
+    изменения из соседних сюда не приходят) индекс не загружается и всё
+    читается из базы.
+    """
+    if POST_INDEX_ENABLED:
+        post_index.load(await get_pending_summaries())
+
+
+# ---------- чтение с fallback на базу ----------
+
+
+async def pending_page(
+    limit: int, after: Key | None = None, before: Key | None = None
+) -> list[dict]:
+    if post_index.ready:
+        return post_index.page(limit, after, before)
+    return await get_pending_posts_page(limit, after, before)
+
+
+async def pending_count() -> int:
+    if post_index.ready:
+        return len(post_index)
+    return await count_pending_posts()
+
+
+# ---------- нагрузка по дням для календаря ----------
+
+# без индекса правки из соседних процессов сюда не приходят —
+# такие счётчики живут недолго
+DAY_LOAD_TTL_SECONDS = 60
+
+# (year, month) → (когда посчитано, посты по дням месяца)
+_day_load_cache: dict[tuple[int, int], tuple[float, tuple[int, ...]]] = {}
+
+
+def _reset_day_load(post_id: int, row: dict | None):
+    _day_load_cache.clear()
+
+
+add_post_listener(_reset_day_load)
+
+
+def _day_bounds(year: int, month: int) -> list[int]:
+    """
+    Начала дней месяца (и следующего за ним дня) в часовом поясе канала.
+    """
+    days = calendar.monthrange(year, month)[1]
+    starts = [datetime(year, month, day) for day in range(1, days + 1)]
+    starts.append(
+        datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    )
+    return [to_ts(LA.localize(dt)) for dt in starts]
+
+
+async def day_load(year: int, month: int) -> tuple[int, ...]:
+    """
+    Сколько постов запланировано на каждый день месяца (индекс — день - 1).
+    Из индекса в памяти, без него — одним запросом к базе. Результат
+    кэшируется до первого изменения любого поста.
+    """
+    key = (year, month)
+    cached = _day_load_cache.get(key)
+    if cached is not None and (
+        post_index.ready or time.monotonic() - cached[0] < DAY_LOAD_TTL_SECONDS
+    ):
+        return cached[1]
+
+    bounds = _day_bounds(year, month)
+    if post_index.ready:
+        load = tuple(
+            post_index.count_between(start, end)
+            for start, end in zip(bounds, bounds[1:])
+        )
+    else:
+        load = tuple(await count_pending_by_day(bounds))
+
+    _day_load_cache[key] = (time.monotonic(), load)
+    return load
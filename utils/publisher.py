@@ -0,0 +1,204 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import (
+    LOW_PRIORITY_RESERVE,
+    PUBLISH_QUEUE_SIZE,
+    PUBLISH_WORKERS,
+    TG_CHAT_BURST,
+    TG_CHAT_PER_MINUTE,
+    TG_GLOBAL_PER_SECOND,
+)
+from utils.logger import logger
+
+
+# ==========================================
+#            TOKEN BUCKET
+# ==========================================
+
+
+class TokenBucket:
+    """
+    rate токенов в секунду, не больше capacity про запас.
+    Ожидающие обслуживаются по очереди (FIFO через lock).
+
+    Запрос дороже capacity (альбом больше всплеска) ждёт полного ведра
+    и уходит в долг: следующие ждут, пока долг не отработается.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, cost: float = 1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+
+                self._refill(now)
+                need = min(cost, self.capacity)
+                if self._tokens >= need:
+                    self._tokens -= cost
+                    return
+
+                await asyncio.sleep((need - self._tokens) / self.rate)
+
+    def try_acquire(self, cost: float = 1.0, reserve: float = 0.0) -> bool:
+        """
+        Без ожидания: списать cost, только если никто не ждёт в очереди
+        и после списания останется не меньше reserve токенов.
+        """
+        now = time.monotonic()
+        if self._lock.locked() or now < self._blocked_until:
+            return False
+
+        self._refill(now)
+        if self._tokens - cost < reserve:
+            return False
+        self._tokens -= cost
+        return True
+
+    def pause(self, seconds: float):
+        """
+        Telegram ответил retry_after — до этого момента токенов не выдаём.
+        """
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+# ==========================================
+#       GLOBAL + PER-CHAT RATE LIMITER
+# ==========================================
+
+
+class RateLimiter:
+    """
+    Лимиты Bot API: общий (~30 сообщений/с на бота) и на чат
+    (~20 сообщений/мин в канал или группу). Альбом считается
+    по числу элементов.
+    """
+
+    def __init__(self, global_rate: float, chat_per_minute: float, chat_burst: float):
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_per_minute / 60
+        self._chat_burst = chat_burst
+        self._chats: dict[str, TokenBucket] = {}
+
+    def _chat(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        bucket = self._chats.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self._chat_rate, self._chat_burst)
+            self._chats[key] = bucket
+        return bucket
+
+    async def acquire(self, chat_id, cost: float = 1.0):
+        # сначала чат (ждать можно долго), потом общий бюджет
+        await self._chat(chat_id).acquire(cost)
+        await self._global.acquire(cost)
+
+    def try_acquire_low(self, cost: float = 1.0) -> bool:
+        """
+        Для второстепенных отправок (эхо пользователям): без ожидания и
+        только из общего бюджета сверх резерва LOW_PRIORITY_RESERVE.
+        Пока публикации ждут токенов, эхо не получает ничего.
+        False — отправку надо пропустить.
+        """
+        reserve = self._global.capacity * LOW_PRIORITY_RESERVE
+        return self._global.try_acquire(cost, reserve)
+
+    def penalize(self, chat_id, retry_after: float):
+        self._chat(chat_id).pause(retry_after)
+
+    async def run(
+        self,
+        chat_id,
+        call: Callable[[], Awaitable],
+        cost: float = 1.0,
+        attempts: int = 5,
+    ):
+        """
+        Выполняет запрос к API в рамках лимитов. На TelegramRetryAfter
+        чат замораживается на retry_after и запрос повторяется.
+        """
+        for attempt in range(1, attempts + 1):
+            await self.acquire(chat_id, cost)
+            try:
+                return await call()
+            except TelegramRetryAfter as e:
+                logger.warning(
+                    "Flood control in %s: retry after %ss (attempt %s/%s)",
+                    chat_id,
+                    e.retry_after,
+                    attempt,
+                    attempts,
+                )
+                self.penalize(chat_id, e.retry_after)
+                if attempt == attempts:
+                    raise
+
+
+rate_limiter = RateLimiter(TG_GLOBAL_PER_SECOND, TG_CHAT_PER_MINUTE, TG_CHAT_BURST)
+
+
+# ==========================================
+#            PUBLISHER POOL
+# ==========================================
+
+
+class Publisher:
+    """
+    Очередь публикаций + пул воркеров. Задачи планировщика только
+    кладут post_id в очередь, отправка идёт через rate_limiter.
+    Очередь ограничена: при переполнении submit ждёт (backpressure).
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers_count = max(1, workers)
+        self._queue: asyncio.Queue[int] = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[asyncio.Task] = []
+        self._handler: Callable[[int], Awaitable] | None = None
+
+    def start(self, handler: Callable[[int], Awaitable]):
+        self._handler = handler
+        for _ in range(self.workers_count):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def submit(self, post_id: int):
+        await self._queue.put(post_id)
+
+    async def _worker(self):
+        while True:
+            post_id = await self._queue.get()
+            try:
+                await self._handler(post_id)
+            except Exception:
+                logger.exception("Failed to publish post %s", post_id)
+            finally:
+                self._queue.task_done()
+
+
+publisher = Publisher(PUBLISH_WORKERS, PUBLISH_QUEUE_SIZE)
@@ -0,0 +1,161 @@
+from datetime import date, datetime, timedelta
+
+from utils.timeutils import LA, from_ts, to_ts
+
+# Повторяющиеся посты: правило хранится в posts.rrule, а в базе всегда
+# одна строка — следующее вхождение. После публикации планировщик
+# вычисляет следующее (next_occurrence) от начала серии
+# (posts.rrule_anchor_ts) и сдвигает publish_ts.
+#
+# Поддерживается подмножество RFC 5545 RRULE:
+#   FREQ=DAILY|WEEKLY|MONTHLY   — обязательно
+#   INTERVAL=n                  — каждые n дней/недель/месяцев
+#   BYDAY=MO,TU,...             — дни недели (только для WEEKLY)
+#   UNTIL=YYYYMMDD              — последняя дата, включительно
+# Время суток — как у начала серии, по часовому поясу канала
+# (переход на летнее время не сдвигает час публикации).
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+
+# защита от правил, у которых следующего вхождения нет (31-е число
+# каждые 12 месяцев в феврале и т.п.)
+MAX_STEPS = 1000
+
+
+class RecurrenceError(ValueError):
+    """
+    Правило повтора не разбирается.
+    """
+
+
+def parse_rule(rule: str) -> dict:
+    """
+    "FREQ=WEEKLY;BYDAY=MO,TH" → {"freq": "WEEKLY", "interval": 1,
+    "byday": {0, 3}, "until": None}.
+    """
+    try:
+        parts = dict(part.split("=", 1) for part in rule.upper().split(";") if part)
+    except ValueError as e:
+        raise RecurrenceError(f"invalid rule {rule!r}") from e
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise RecurrenceError(f"unsupported FREQ in {rule!r}")
+
+    try:
+        interval = int(parts.pop("INTERVAL", "1"))
+        byday = {
+            WEEKDAYS.index(day) for day in parts.pop("BYDAY", "").split(",") if day
+        }
+        until = parts.pop("UNTIL", None)
+        until = datetime.strptime(until[:8], "%Y%m%d").date() if until else None
+    except ValueError as e:
+        raise RecurrenceError(f"invalid rule {rule!r}") from e
+
+    if interval < 1 or parts or (byday and freq != "WEEKLY"):
+        raise RecurrenceError(f"unsupported rule {rule!r}")
+
+    return {"freq": freq, "interval": interval, "byday": byday, "until": until}
+
+
+def _add_months(day: date, months: int) -> date | None:
+    month = day.month - 1 + months
+    try:
+        return day.replace(year=day.year + month // 12, month=month % 12 + 1)
+    except ValueError:
+        return None  # в этом месяце нет такого числа
+
+
+def _candidates(rule: dict, anchor: date, after: date):
+    """
+    Даты вхождений после anchor по возрастанию, начиная незадолго
+    до after: серия может идти годами, перебирать её с начала незачем.
+    """
+    interval = rule["interval"]
+    days = (after - anchor).days
+
+    if rule["freq"] == "DAILY":
+        start = max(1, days // interval)
+        for step in range(start, start + MAX_STEPS):
+            yield anchor + timedelta(days=step * interval)
+
+    elif rule["freq"] == "WEEKLY":
+        byday = rule["byday"] or {anchor.weekday()}
+        week_start = anchor - timedelta(days=anchor.weekday())
+        start = max(1, days - 7)
+        for offset in range(start, start + MAX_STEPS * 7):
+            day = anchor + timedelta(days=offset)
+            week = (day - week_start).days // 7
+            if week % interval == 0 and day.weekday() in byday:
+                yield day
+
+    else:  # MONTHLY
+        months = (after.year - anchor.year) * 12 + after.month - anchor.month
+        start = max(1, months // interval)
+        for step in range(start, start + MAX_STEPS):
+            day = _add_months(anchor, step * interval)
+            if day is not None:
+                yield day
+
+
+def next_occurrence(rule: str, anchor_ts: int, after_ts: int) -> int | None:
+    """
+    Следующее вхождение правила позже after_ts (UTC epoch).
+    anchor_ts — начало серии (posts.rrule_anchor_ts): от него считаются
+    интервал и время суток, поэтому публикация не по расписанию (повтор,
+    ручной выпуск просроченного) серию не сдвигает.
+    Пропущенные вхождения (бот лежал) не догоняются.
+    None — серия закончилась (UNTIL).
+    """
+    parsed = parse_rule(rule)
+    anchor = from_ts(anchor_ts)
+
+    after = from_ts(after_ts).date()
+    for day in _candidates(parsed, anchor.date(), after):
+        if parsed["until"] and day > parsed["until"]:
+            return None
+        local = datetime.combine(day, anchor.time().replace(tzinfo=None))
+        ts = to_ts(LA.localize(local))
+        if ts > after_ts:
+            return ts
+
+    return None
+
+
+def first_occurrence(rule: str, start_ts: int) -> int | None:
+    """
+    Первое вхождение серии, которую админ начал с start_ts: сам start_ts,
+    если его день подходит правилу (BYDAY), иначе ближайшее вхождение
+    после него — «по будням» с субботы начинается в понедельник.
+    None — вхождений нет (дата позже UNTIL).
+    """
+    parsed = parse_rule(rule)
+    day = from_ts(start_ts).date()
+    if parsed["until"] and day > parsed["until"]:
+        return None
+    if not parsed["byday"] or day.weekday() in parsed["byday"]:
+        return start_ts
+    return next_occurrence(rule, start_ts, start_ts - 1)
+
+
+def describe_rule(rule: str | None) -> str:
+    """
+    Короткая подпись правила для админа.
+    """
+    if not rule:
+        return "без повтора"
+
+    parsed = parse_rule(rule)
+    if parsed["interval"] == 1:
+        text = {"DAILY": "каждый день", "WEEKLY": "каждую неделю"}.get(
+            parsed["freq"], "каждый месяц"
+        )
+    else:
+        unit = {"DAILY": "дн.", "WEEKLY": "нед.", "MONTHLY": "мес."}[parsed["freq"]]
+        text = f"каждые {parsed['interval']} {unit}"
+    if parsed["byday"]:
+        text += " (" + ", ".join(WEEKDAYS[day] for day in sorted(parsed["byday"])) + ")"
+    if parsed["until"]:
+        text += f" до {parsed['until']:%Y-%m-%d}"
+    return text
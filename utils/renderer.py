@@ -0,0 +1,182 @@
+import json
+from dataclasses import dataclass
+
+from aiogram.methods import (
+    SendAnimation,
+    SendAudio,
+    SendDocument,
+    SendMediaGroup,
+    SendMessage,
+    SendPhoto,
+    SendVideo,
+    SendVideoNote,
+    SendVoice,
+    TelegramMethod,
+)
+from aiogram.types import (
+    InlineKeyboardMarkup,
+    InputMediaAnimation,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+)
+
+# Единый движок отрисовки поста: публикация по расписанию, «опубликовать
+# сейчас» и превью админу. Пост один раз декодируется в Payload, а запросы
+# к API собираются по таблицам type → метод, без цепочек if/elif.
+
+
+class PostPayloadError(ValueError):
+    """
+    Содержимое поста не разбирается (битый JSON и т.п.) — повтор не поможет.
+    """
+
+
+@dataclass(frozen=True, slots=True)
+class Payload:
+    """
+    Декодированный пост.
+    text — текст поста или подпись к медиа;
+    items — элементы альбома: (type, file_id).
+    """
+
+    type: str
+    text: str | None = None
+    file_id: str | None = None
+    items: tuple[tuple[str, str], ...] = ()
+
+    @property
+    def cost(self) -> int:
+        """
+        Сколько сообщений Telegram насчитает за отправку.
+        """
+        return len(self.items) if self.type == "media_group" else 1
+
+
+# ==========================================
+#            DECODE
+# ==========================================
+
+
+def _decode_text(post_type: str, raw: str) -> Payload:
+    return Payload(post_type, text=raw)
+
+
+def _decode_album(post_type: str, raw: str) -> Payload:
+    try:
+        album = json.loads(raw)  # {"items": [...], "caption": "..."}
+        items = tuple(
+            (item["type"], item["file_id"])
+            for item in album.get("items", [])
+            if item["type"] in ALBUM_MEDIA
+        )
+    except Exception as e:
+        raise PostPayloadError("invalid media_group JSON") from e
+
+    return Payload(post_type, text=album.get("caption"), items=items[:10])
+
+
+def _decode_single(post_type: str, raw: str) -> Payload:
+    try:
+        data = json.loads(raw)  # {"file_id": "...", "caption": "..."}
+        file_id = data["file_id"]
+    except Exception as e:
+        raise PostPayloadError(f"invalid {post_type} JSON") from e
+
+    return Payload(post_type, text=data.get("caption"), file_id=file_id)
+
+
+# ==========================================
+#            SENDER TABLES
+# ==========================================
+
+# одиночное медиа: type → (метод API, имя поля с file_id)
+SINGLE_SENDERS: dict[str, tuple[type[TelegramMethod], str]] = {
+    "photo": (SendPhoto, "photo"),
+    "video": (SendVideo, "video"),
+    "document": (SendDocument, "document"),
+    "audio": (SendAudio, "audio"),
+    "voice": (SendVoice, "voice"),
+    "animation": (SendAnimation, "animation"),
+    "video_note": (SendVideoNote, "video_note"),
+}
+
+# у кружков нет подписи
+NO_CAPTION = frozenset({"video_note"})
+
+# элементы альбома: type → InputMedia*
+ALBUM_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "document": InputMediaDocument,
+    "animation": InputMediaAnimation,
+}
+
+DECODERS = {
+    "text": _decode_text,
+    "media_group": _decode_album,
+    **{post_type: _decode_single for post_type in SINGLE_SENDERS},
+}
+
+
+def decode(post_type: str, raw: str) -> Payload:
+    decoder = DECODERS.get(post_type)
+    if decoder is None:
+        raise PostPayloadError(f"unknown post type {post_type!r}")
+    return decoder(post_type, raw)
+
+
+def decode_post(post: dict) -> Payload:
+    return decode(post["type"], post["content"])
+
+
+# ==========================================
+#            RENDER
+# ==========================================
+
+
+Requests = tuple[TelegramMethod, ...]
+
+
+def _render_text(payload: Payload, chat_id, reply_markup) -> Requests:
+    request = SendMessage(chat_id=chat_id, text=payload.text, reply_markup=reply_markup)
+    return (request,)
+
+
+def _render_album(payload: Payload, chat_id, reply_markup) -> Requests:
+    # у альбома клавиатуры быть не может — reply_markup игнорируется
+    if not payload.items:
+        return ()
+    media = [
+        ALBUM_MEDIA[item_type](media=file_id, caption=None)
+        for item_type, file_id in payload.items
+    ]
+    media[0].caption = payload.text  # подпись альбома — у первого элемента
+    return (SendMediaGroup(chat_id=chat_id, media=media),)
+
+
+def _render_single(payload: Payload, chat_id, reply_markup) -> Requests:
+    method, field = SINGLE_SENDERS[payload.type]
+    kwargs = {field: payload.file_id, "reply_markup": reply_markup}
+    if payload.type not in NO_CAPTION:
+        kwargs["caption"] = payload.text
+    return (method(chat_id=chat_id, **kwargs),)
+
+
+RENDERERS = {
+    "text": _render_text,
+    "media_group": _render_album,
+    **{post_type: _render_single for post_type in SINGLE_SENDERS},
+}
+
+
+def render(
+    payload: Payload,
+    chat_id: int | str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+) -> Requests:
+    """
+    Запросы к API, которые отправят payload в chat_id.
+    У альбома клавиатуры быть не может — reply_markup для него игнорируется.
+    """
+    return RENDERERS[payload.type](payload, chat_id, reply_markup)
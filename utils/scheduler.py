@@ -1,15 +1,104 @@
+import asyncio
 import pytz
-import json
+import random
+import time
 from datetime import datetime
+from typing import Awaitable, Callable
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from aiogram import Bot
-
-from utils.db import get_scheduled_posts, mark_post_as_sent
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+)
+
+from config import (
+    CATCHUP_INTERVAL_SECONDS,
+    FANOUT_CONCURRENCY,
+    OVERDUE_CATCHUP_MINUTES,
+    OVERDUE_POLICY,
+    PAYLOAD_WARMUP_SECONDS,
+    PUBLISH_LEASE_SECONDS,
+    PUBLISH_MAX_ATTEMPTS,
+    RETRY_BASE_SECONDS,
+    RETRY_MAX_SECONDS,
+    SCHEDULER_ENGINE,
+    SCHEDULER_HORIZON_HOURS,
+    SCHEDULER_REFILL_MINUTES,
+    SCHEDULER_SHARDS,
+    WORKER_HEARTBEAT_SECONDS,
+    WORKER_ID,
+    WORKER_TTL_SECONDS,
+)
+from utils.db import (
+    get_scheduled_posts,
+    get_post_targets,
+    mark_target_sent,
+    mark_target_failed,
+    mark_post_as_sent,
+    get_pending_due_before,
+    claim_post,
+    release_post,
+    move_to_dead_letter,
+    report_failed_targets,
+    requeue_failed_posts,
+    set_posts_status,
+    release_held_posts,
+    recover_expired_leases,
+    renew_lease,
+    release_claims,
+    heartbeat_worker,
+    remove_worker,
+    get_post_rules,
+    advance_recurring_post,
+)
+from utils.locks import post_locks
+from utils.logger import logger
+from utils.dispatcher import HeapDispatcher
+from utils.payloads import PreparedPost, payload_cache, warm_up_payloads
+from utils.renderer import PostPayloadError
+from utils.publisher import publisher, rate_limiter
+from utils.recurrence import RecurrenceError, next_occurrence
+from utils.timeutils import now_ts, to_ts, from_ts
 
 LA_TZ = pytz.timezone("America/New_York")
 
 scheduler = AsyncIOScheduler(timezone=LA_TZ)
 
+# Окно: задачи APScheduler создаются только для постов с publish_ts <=
+# _window_end, остальные лежат в БД и подтягиваются refill_window().
+REFILL_SECONDS = int(SCHEDULER_REFILL_MINUTES * 60)
+# окно обязано перекрывать интервал дочитки, иначе посты будут опаздывать
+HORIZON_SECONDS = max(int(SCHEDULER_HORIZON_HOURS * 3600), REFILL_SECONDS * 2)
+
+_bot: Bot | None = None
+_window_end = 0
+_in_flight: set[int] = set()  # задача уже сработала, публикация идёт
+_background: set[asyncio.Task] = set()
+
+# SCHEDULER_ENGINE=heap — посты ведёт HeapDispatcher (один таймер на все),
+# APScheduler остаётся только для служебных периодических задач
+_dispatcher: HeapDispatcher | None = None
+
+
+def _fire(post_id: int):
+    # помечаем синхронно, до старта корутины: иначе refill_window,
+    # пришедший в этот зазор, поставил бы пост второй раз
+    _in_flight.add(post_id)
+    return _run_post(_bot, post_id)
+
+
+if SCHEDULER_ENGINE == "heap":
+    _dispatcher = HeapDispatcher(_fire)
+
+# SCHEDULER_SHARDS > 0 — посты делятся между процессами по id % N,
+# процесс ведёт только свои шарды (None — все посты)
+_shards: frozenset[int] | None = None
+
+
+def _owns(post_id: int) -> bool:
+    return _shards is None or post_id % SCHEDULER_SHARDS in _shards
+
 
 # ==========================================
 #            PUBLISH POST
@@ -17,117 +106,541 @@ scheduler = AsyncIOScheduler(timezone=LA_TZ)
 
 
 async def publish_post(bot: Bot, post_id: int):
-    post = await get_scheduled_posts(post_id)
+    # правка и удаление этого поста ждут, пока идёт публикация
+    async with post_locks[post_id]:
+        await _publish(bot, post_id)
 
-    if not post:
-        return
 
-    chat_id = post["channel_id"]
-    post_type = post["type"]
-    raw = post["content"]
+async def _publish(bot: Bot, post_id: int):
+    post = await claim_post(post_id, WORKER_ID, PUBLISH_LEASE_SECONDS)
 
-    # ---------- TEXT ----------
-    if post_type == "text":
-        await bot.send_message(chat_id, raw)
-        await mark_post_as_sent(post_id)
+    if post is None:
+        # не захватили: пост уже отправлен/удалён, его публикует другой
+        # воркер — или задача устарела (пост перенесли, пока она висела)
+        post = await get_scheduled_posts(post_id)
+        if post and post["status"] == "pending" and post["publish_ts"] > now_ts():
+            schedule_post(bot, post_id, from_ts(post["publish_ts"]))
         return
 
-    # ---------- MEDIA GROUP (ALBUM) ----------
-    if post_type == "media_group":
-        from aiogram.types import (
-            InputMediaPhoto,
-            InputMediaVideo,
-            InputMediaDocument,
-            InputMediaAnimation,
+    targets = await get_post_targets(post_id)
+    pending = [t["channel_id"] for t in targets if t["status"] == "pending"]
+
+    renewal = asyncio.create_task(_renew_lease(post_id))
+    try:
+        errors = await fan_out(
+            bot,
+            post,
+            pending,
+            on_sent=lambda chat_id: mark_target_sent(post_id, chat_id),
         )
+    finally:
+        renewal.cancel()
+    if errors and await _handle_failure(bot, post, errors):
+        return
 
-        try:
-            album = json.loads(raw)  # {"items": [...], "caption": "..."}
-        except Exception:
-            # не валидный JSON — просто помечаем как отправленный и выходим
-            await mark_post_as_sent(post_id)
-            return
+    payload_cache.invalidate(post_id)
 
-        items = album.get("items", [])
-        caption = album.get("caption")
-        media = []
+    targets = await get_post_targets(post_id)
+    failed = [t for t in targets if t["status"] == "failed"]
+    error = "; ".join(f"{t['channel_id']}: {t['last_error']}" for t in failed)[:500]
+    delivered = any(t["status"] == "sent" for t in targets)
 
-        for idx, item in enumerate(items[:10]):
-            itype = item["type"]
-            file_id = item["file_id"]
-            cap = caption if idx == 0 else None
+    # серия продолжается, если пост ушёл хоть в один канал: отказавшие
+    # насовсем каналы выпадают из неё, а админ видит их в /failed
+    if post["rrule"] and delivered and await _advance_recurring(bot, post):
+        if failed:
+            await report_failed_targets(post_id, error, post["attempts"] + 1)
+            logger.error("Recurring post %s has failed targets: %s", post_id, error)
+        return
 
-            if itype == "photo":
-                media.append(InputMediaPhoto(media=file_id, caption=cap))
-            elif itype == "video":
-                media.append(InputMediaVideo(media=file_id, caption=cap))
-            elif itype == "document":
-                media.append(InputMediaDocument(media=file_id, caption=cap))
-            elif itype == "animation":
-                media.append(InputMediaAnimation(media=file_id, caption=cap))
+    if failed:
+        # часть каналов отказала насовсем (сейчас или в прошлых
+        # попытках) — пост в dead letter, чтобы админ это увидел (/failed)
+        await move_to_dead_letter(post_id, WORKER_ID, error)
+        logger.error("Post %s moved to dead letter: %s", post_id, error)
+        return
 
-        if media:
-            await bot.send_media_group(chat_id, media)
+    if not await mark_post_as_sent(post_id, WORKER_ID):
+        logger.warning("Lease on post %s expired before it was marked sent", post_id)
 
-        await mark_post_as_sent(post_id)
-        return
 
-    # ---------- SINGLE MEDIA ----------
+async def _renew_lease(post_id: int):
+    """
+    Долгая рассылка (ожидание лимитов, retry_after) не должна пережить
+    захват: иначе recover_expired_leases вернёт пост в pending и его
+    опубликуют второй раз.
+    """
+    while True:
+        await asyncio.sleep(PUBLISH_LEASE_SECONDS / 3)
+        if not await renew_lease(post_id, WORKER_ID, PUBLISH_LEASE_SECONDS):
+            logger.warning("Lost the publish lease on post %s", post_id)
+            return
+
+
+async def _advance_recurring(bot: Bot, post: dict) -> bool:
+    """
+    Повторяющийся пост вместо sent переходит на следующее вхождение —
+    в базе по-прежнему одна строка и одна задача.
+    False — серия закончилась (или правило битое): пост станет sent.
+    """
+    post_id = post["id"]
     try:
-        data = json.loads(raw)
-    except Exception:
-        await mark_post_as_sent(post_id)
-        return
+        next_ts = next_occurrence(post["rrule"], post["rrule_anchor_ts"], now_ts())
+    except RecurrenceError:
+        logger.exception("Post %s has an invalid rrule %r", post_id, post["rrule"])
+        return False
+
+    if next_ts is None:
+        return False
+
+    if await advance_recurring_post(post_id, next_ts, WORKER_ID):
+        schedule_post(bot, post_id, from_ts(next_ts))
+    else:
+        logger.warning("Lease on post %s expired before it was advanced", post_id)
+    return True
+
 
-    file_id = data.get("file_id")
-    caption = data.get("caption")
+# ==========================================
+#         FAILURES: RETRY / DEAD LETTER
+# ==========================================
 
-    if post_type == "photo":
-        await bot.send_photo(chat_id, file_id, caption=caption)
-    elif post_type == "video":
-        await bot.send_video(chat_id, file_id, caption=caption)
-    elif post_type == "document":
-        await bot.send_document(chat_id, file_id, caption=caption)
-    elif post_type == "audio":
-        await bot.send_audio(chat_id, file_id, caption=caption)
-    elif post_type == "voice":
-        await bot.send_voice(chat_id, file_id, caption=caption)
-    elif post_type == "animation":
-        await bot.send_animation(chat_id, file_id, caption=caption)
-    elif post_type == "video_note":
-        await bot.send_video_note(chat_id, file_id)
 
-    await mark_post_as_sent(post_id)
+# ошибки, после которых повторять бессмысленно: канал сразу выходит из рассылки
+PERMANENT_ERRORS = (
+    PostPayloadError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+)
+
+
+def _retry_delay(attempts: int) -> float:
+    """
+    Экспоненциальная задержка с разбросом ±20%, чтобы повторы
+    упавших разом постов не приходили одной пачкой.
+    """
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _error_text(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}"[:500]
+
+
+async def _handle_failure(
+    bot: Bot, post: dict, errors: dict[str, Exception]
+) -> bool:
+    """
+    errors — ошибки по каналам. Каналы с постоянной ошибкой (или все,
+    если попытки кончились) выходят из рассылки (failed); остальные
+    повторяются с задержкой. True — повтор запланирован (или захват
+    потерян); False — повторять нечего, попытка завершается как обычно:
+    dead letter или следующее вхождение серии (_publish).
+    """
+    post_id = post["id"]
+    text = "; ".join(
+        f"{chat_id}: {_error_text(error)}" for chat_id, error in errors.items()
+    )[:500]
+
+    exhausted = post["attempts"] + 1 >= PUBLISH_MAX_ATTEMPTS
+    retryable = False
+    for chat_id, error in errors.items():
+        permanent = exhausted or isinstance(error, PERMANENT_ERRORS)
+        retryable = retryable or not permanent
+        await mark_target_failed(post_id, chat_id, _error_text(error), permanent)
+
+    if not retryable:
+        return False
+
+    attempts = await release_post(post_id, WORKER_ID, text)
+    if attempts is None:
+        return True
+
+    delay = _retry_delay(attempts)
+    logger.warning(
+        "Post %s failed (attempt %s/%s), retry in %.0fs: %s",
+        post_id,
+        attempts,
+        PUBLISH_MAX_ATTEMPTS,
+        delay,
+        text,
+    )
+    # мимо проверки окна: повтор должен случиться именно через delay
+    _add_job(bot, post_id, from_ts(time.time() + delay))
+    return True
 
 
 # ==========================================
-#          SCHEDULE POST
+#            SEND (BY TYPE)
 # ==========================================
 
 
-def schedule_post(bot: Bot, post_id: int, dt: datetime):
+async def _send_post(bot: Bot, prepared: PreparedPost, chat_id: str):
+    # все запросы к API — через общий rate limiter
+    for request in prepared.requests:
+        await rate_limiter.run(chat_id, lambda: bot(request), prepared.cost)
+
+
+async def fan_out(
+    bot: Bot,
+    post: dict,
+    chat_ids: list[str],
+    prepare: Callable[[dict, str], PreparedPost] = payload_cache.get_or_compile,
+    on_sent: Callable[[str], Awaitable] | None = None,
+) -> dict[str, Exception]:
+    """
+    Отправляет пост во все chat_ids параллельно, но не больше
+    FANOUT_CONCURRENCY каналов одновременно (лимиты на чат и общий —
+    по-прежнему в rate_limiter). Единственный путь рассылки: и по
+    расписанию, и «опубликовать сейчас» из админки.
+
+    prepare собирает запросы для канала: по умолчанию из кэша
+    (обычно пост уже собран warm_up_payloads), для несохранённого
+    поста — compile_post. on_sent вызывается сразу после удачного
+    канала — так повтор не продублирует пост там, куда он уже ушёл.
+    Возвращает ошибки по каналам.
+    """
+    semaphore = asyncio.Semaphore(FANOUT_CONCURRENCY)
+    errors: dict[str, Exception] = {}
+
+    async def deliver(chat_id: str):
+        async with semaphore:
+            try:
+                await _send_post(bot, prepare(post, chat_id), chat_id)
+            except Exception as e:
+                errors[chat_id] = e
+                return
+        if on_sent is not None:
+            await on_sent(chat_id)
+
+    await asyncio.gather(*(deliver(chat_id) for chat_id in chat_ids))
+    return errors
+
+
+async def _run_post(bot: Bot, post_id: int):
+    """
+    Срабатывание задачи: пост уходит в очередь публикатора,
+    сама отправка — в воркере (_deliver).
+    """
+    _in_flight.add(post_id)
+    await publisher.submit(post_id)
+
+
+async def _deliver(post_id: int):
+    try:
+        await publish_post(_bot, post_id)
+    finally:
+        _in_flight.discard(post_id)
+
+
+def _job_id(post_id: int) -> str:
+    return f"post_{post_id}"
+
+
+# ---------- задачи постов: APScheduler или куча ----------
+
+
+def _job_due(post_id: int) -> int | None:
+    """
+    Время, на которое стоит задача поста (None — задачи нет).
+    """
+    if _dispatcher is not None:
+        return _dispatcher.due(post_id)
+    job = scheduler.get_job(_job_id(post_id))
+    return to_ts(job.next_run_time) if job and job.next_run_time else None
+
+
+def _add_job(bot: Bot, post_id: int, dt: datetime):
+    if _dispatcher is not None:
+        _dispatcher.add(post_id, to_ts(dt))
+        return
+
     scheduler.add_job(
-        publish_post,
+        _run_post,
         "date",
         args=[bot, post_id],
         run_date=dt,
-        id=f"post_{post_id}",
-        misfire_grace_time=3600,  # 1 hour
+        id=_job_id(post_id),
+        replace_existing=True,
+        # задача только ставит пост в очередь — выполняем при любом опоздании,
+        # просрочку после простоя разбирает reconcile_overdue
+        misfire_grace_time=None,
     )
 
 
+def _remove_job(post_id: int):
+    if _dispatcher is not None:
+        _dispatcher.remove(post_id)
+        return
+
+    job = scheduler.get_job(_job_id(post_id))
+    if job:
+        job.remove()
+
+
+def _scheduled_post_ids() -> list[int]:
+    if _dispatcher is not None:
+        return _dispatcher.post_ids()
+    return [
+        int(job.id.removeprefix("post_"))
+        for job in scheduler.get_jobs()
+        if job.id.startswith("post_")
+    ]
+
+
+# ==========================================
+#          SLIDING WINDOW
+# ==========================================
+
+
+async def _recover_leases():
+    recovered = await recover_expired_leases()
+    if recovered:
+        logger.warning("Recovered %s posts with expired publish leases", recovered)
+
+
+async def refill_window():
+    """
+    Сдвигает окно на now + HORIZON и создаёт задачи для постов,
+    попавших в него. Публикуемые и уже запланированные на их publish_ts
+    пропускаются; задача на другое время переставляется — пост мог
+    перенести процесс, который его не ведёт (чужой шард), и
+    reschedule_post там ничего не сделал.
+    Захваты, брошенные остановленным процессом, сначала возвращаются
+    в pending — иначе такой пост не подхватит никто.
+    """
+    global _window_end
+
+    await _recover_leases()
+
+    # границу двигаем до запроса: посты, сохранённые во время чтения,
+    # schedule_post уже посчитает попавшими в окно
+    _window_end = now_ts() + HORIZON_SECONDS
+
+    for post in await get_pending_due_before(_window_end, _shards, SCHEDULER_SHARDS):
+        post_id = post["id"]
+        if post_id in _in_flight or _job_due(post_id) == post["publish_ts"]:
+            continue
+        _add_job(_bot, post_id, from_ts(post["publish_ts"]))
+
+
+# ==========================================
+#          SHARDING
+# ==========================================
+
+
+async def rebalance(refill: bool = True):
+    """
+    Отметка процесса в scheduler_workers и пересчёт своих шардов:
+    шард s достаётся live[s % len(live)] по отсортированному списку
+    живых воркеров. Шарды упавшего забирают остальные через
+    WORKER_TTL_SECONDS, его зависшие захваты возвращаются в pending.
+
+    Окно дочитывается на каждой отметке: посты, созданные в другом
+    процессе, подхватываются не позже чем через WORKER_HEARTBEAT_SECONDS,
+    а захваты упавших процессов возвращаются в pending.
+    Пока процессы расходятся во мнении о шардах, дубль отсекает claim_post.
+    При старте refill=False: окно заполняется только после
+    reconcile_overdue, иначе просрочка ушла бы в публикацию мимо
+    OVERDUE_POLICY.
+    """
+    global _shards
+
+    live = await heartbeat_worker(WORKER_ID, WORKER_TTL_SECONDS)
+    index = live.index(WORKER_ID)
+    shards = frozenset(
+        shard for shard in range(SCHEDULER_SHARDS) if shard % len(live) == index
+    )
+
+    if shards != _shards:
+        _shards = shards
+        logger.info(
+            "Worker %s owns %s of %s shards (%s live workers)",
+            WORKER_ID,
+            len(shards),
+            SCHEDULER_SHARDS,
+            len(live),
+        )
+        # шарды ушли другому процессу — их задачи здесь больше не нужны
+        for post_id in _scheduled_post_ids():
+            if not _owns(post_id) and post_id not in _in_flight:
+                _remove_job(post_id)
+
+    if refill:
+        await refill_window()
+
+
+# ==========================================
+#       STARTUP RECONCILIATION
+# ==========================================
+
+
+async def reconcile_overdue():
+    """
+    Разбор постов, просроченных за время простоя бота:
+
+    - опоздание не больше OVERDUE_CATCHUP_MINUTES — догоняем:
+      публикуем по одному раз в CATCHUP_INTERVAL_SECONDS;
+    - старше — по OVERDUE_POLICY: catchup (тоже догоняем),
+      expire (больше не публикуем) или ask (held, решает админ).
+
+    Просрочка помечается статусом, поэтому при следующих рестартах
+    эти посты уже не подгружаются.
+    """
+    now = now_ts()
+    limit = OVERDUE_CATCHUP_MINUTES * 60
+
+    catch_up, stale = [], []
+    for post in await get_pending_due_before(now, _shards, SCHEDULER_SHARDS):
+        (catch_up if now - post["publish_ts"] <= limit else stale).append(post["id"])
+
+    if stale:
+        if OVERDUE_POLICY == "catchup":
+            catch_up.extend(stale)
+        else:
+            status = "expired" if OVERDUE_POLICY == "expire" else "held"
+            if status == "expired":
+                stale = await _skip_recurring(stale, now)
+            await set_posts_status(stale, status)
+            logger.warning("%s overdue posts marked %s", len(stale), status)
+
+    if catch_up:
+        logger.info("Catching up %s overdue posts", len(catch_up))
+        # синхронно, до refill_window: иначе окно поставит их все разом
+        _in_flight.update(catch_up)
+        task = asyncio.create_task(_drain_catch_up(catch_up))
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+async def _skip_recurring(post_ids: list[int], now: int) -> list[int]:
+    """
+    Просроченное вхождение повторяющегося поста не публикуем, но серия
+    продолжается со следующего. Возвращает остальные (разовые) посты.
+    """
+    rules = await get_post_rules(post_ids)
+    for post_id, (rule, anchor_ts) in rules.items():
+        try:
+            next_ts = next_occurrence(rule, anchor_ts, now)
+        except RecurrenceError:
+            next_ts = None
+        if next_ts is None or not await advance_recurring_post(post_id, next_ts):
+            rules[post_id] = None  # серия закончилась — истекает как разовый
+
+    return [post_id for post_id in post_ids if rules.get(post_id) is None]
+
+
+async def _drain_catch_up(post_ids: list[int]):
+    # по одному: свежие посты по расписанию успевают проходить между ними
+    for post_id in post_ids:
+        await publisher.submit(post_id)
+        await asyncio.sleep(CATCHUP_INTERVAL_SECONDS)
+
+
+async def publish_held(bot: Bot) -> int:
+    """
+    Админ решил опубликовать посты, ждавшие решения.
+    """
+    posts = await release_held_posts(publish=True)
+    for post in posts:
+        schedule_post(bot, post["id"], from_ts(post["publish_ts"]))
+    return len(posts)
+
+
+async def expire_held() -> int:
+    return len(await release_held_posts(publish=False))
+
+
+async def start_scheduler(bot: Bot):
+    """
+    Запуск при старте бота: первое заполнение окна + периодическая дочитка.
+    """
+    global _bot
+    _bot = bot
+
+    await _recover_leases()
+
+    publisher.start(_deliver)
+    scheduler.start()
+    if _dispatcher is not None:
+        _dispatcher.start()
+    if SCHEDULER_SHARDS:
+        # свои шарды — до разбора просрочки и первого окна
+        await rebalance(refill=False)
+        scheduler.add_job(
+            rebalance,
+            "interval",
+            seconds=WORKER_HEARTBEAT_SECONDS,
+            id="rebalance",
+            replace_existing=True,
+        )
+    await reconcile_overdue()
+    await refill_window()
+
+    scheduler.add_job(
+        refill_window,
+        "interval",
+        seconds=REFILL_SECONDS,
+        id="refill_window",
+        replace_existing=True,
+    )
+    # собираем посты заранее: вдвое чаще горизонта прогрева
+    scheduler.add_job(
+        warm_up_payloads,
+        "interval",
+        seconds=max(1, PAYLOAD_WARMUP_SECONDS // 2),
+        id="warm_up_payloads",
+        replace_existing=True,
+    )
+
+
+async def shutdown_scheduler():
+    for task in _background:
+        task.cancel()
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    await publisher.stop()
+    # публикации, прерванные остановкой, сразу доступны следующему запуску
+    released = await release_claims(WORKER_ID)
+    if released:
+        logger.warning("Released %s posts interrupted by shutdown", released)
+    if SCHEDULER_SHARDS:
+        await remove_worker(WORKER_ID)
+
+
+# ==========================================
+#          SCHEDULE POST
+# ==========================================
+
+
+def schedule_post(bot: Bot, post_id: int, dt: datetime):
+    if not _owns(post_id):
+        # чужой шард — пост подхватит его процесс на ближайшем rebalance
+        return
+
+    if to_ts(dt) > _window_end:
+        # за горизонтом — задачу создаст refill_window, когда подойдёт время
+        return
+
+    _add_job(bot, post_id, dt)
+
+
 # ==========================================
 #       RESCHEDULE (CHANGE TIME)
 # ==========================================
 
 
 def reschedule_post(post_id: int, new_dt: datetime):
-    job_id = f"post_{post_id}"
-    try:
-        scheduler.reschedule_job(job_id, trigger="date", run_date=new_dt)
-    except Exception:
-        # если задачи не было — просто игнорируем
-        pass
+    # перенесли за горизонт — из памяти убираем, вернётся через refill
+    if not _owns(post_id) or to_ts(new_dt) > _window_end:
+        _remove_job(post_id)
+        return
+
+    if _bot is not None:
+        # и перенос внутри окна, и пост, который был за горизонтом
+        _add_job(_bot, post_id, new_dt)
 
 
 # ==========================================
@@ -136,8 +649,19 @@ def reschedule_post(post_id: int, new_dt: datetime):
 
 
 def remove_scheduled_post(post_id: int):
-    job_id = f"post_{post_id}"
-    try:
-        scheduler.remove_job(job_id)
-    except Exception:
-        pass
+    _remove_job(post_id)
+
+
+# ==========================================
+#       REQUEUE DEAD LETTER
+# ==========================================
+
+
+async def requeue_failed(bot: Bot) -> int:
+    """
+    Возвращает все failed-посты в расписание. Возвращает их число.
+    """
+    posts = await requeue_failed_posts()
+    for post in posts:
+        schedule_post(bot, post["id"], from_ts(post["publish_ts"]))
+    return len(posts)
@@ -0,0 +1,30 @@
+import time
+from datetime import datetime
+
+import pytz
+
+# В БД время хранится как UTC epoch (секунды), часовой пояс канала
+# применяется только при показе и при вводе даты админом.
+LA = pytz.timezone("America/New_York")
+
+
+def now_ts() -> int:
+    return int(time.time())
+
+
+def to_ts(dt: datetime) -> int:
+    """
+    Aware-datetime → UTC epoch.
+    """
+    return int(dt.timestamp())
+
+
+def from_ts(ts: int) -> datetime:
+    """
+    UTC epoch → aware-datetime в часовом поясе канала.
+    """
+    return datetime.fromtimestamp(ts, LA)
+
+
+def format_ts(ts: int, fmt: str = "%Y-%m-%d %H:%M") -> str:
+    return from_ts(ts).strftime(fmt)
@@ -0,0 +1,133 @@
+import asyncio
+import hmac
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from config import (
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WEBHOOK_WORKERS,
+)
+from utils.logger import logger
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """
+    Приём апдейтов по вебхуку вместо long polling.
+
+    HTTP-хендлер только проверяет секрет и кладёт апдейт в ограниченную
+    очередь, обработку ведут workers воркеров через dp.feed_update.
+    Очередь полна — отвечаем 503, и Telegram повторит доставку позже
+    (backpressure). Несколько таких процессов можно держать за
+    reverse proxy — с MULTI_PROCESS=1: тогда альбомы, FSM и список
+    постов делятся между процессами через базу.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        dp: Dispatcher,
+        secret: str,
+        workers: int = WEBHOOK_WORKERS,
+        queue_size: int = WEBHOOK_QUEUE_SIZE,
+    ):
+        self.bot = bot
+        self.dp = dp
+        self.secret = secret
+        self.workers_count = max(1, workers)
+        self._queue: asyncio.Queue[Update] = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[asyncio.Task] = []
+
+    def app(self, path: str = WEBHOOK_PATH) -> web.Application:
+        app = web.Application()
+        app.router.add_post(path, self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, self.secret):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(
+                await request.json(), context={"bot": self.bot}
+            )
+        except Exception:
+            return web.Response(status=400)
+
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning(
+                "Webhook queue is full, update %s rejected", update.update_id
+            )
+            return web.Response(status=503)
+
+        return web.Response()
+
+    async def _worker(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception:
+                logger.exception("Failed to process update %s", update.update_id)
+            finally:
+                self._queue.task_done()
+
+    async def _on_startup(self, app: web.Application):
+        for _ in range(self.workers_count):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _on_cleanup(self, app: web.Application):
+        # новые апдейты уже не принимаем — даём доработать принятым
+        try:
+            await asyncio.wait_for(self._queue.join(), 10)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Webhook stopped with %s updates queued", self._queue.qsize()
+            )
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """
+    Поднимает aiohttp-сервер на WEBHOOK_HOST:WEBHOOK_PORT.
+    Если задан WEBHOOK_URL — регистрирует вебхук в Telegram; без него
+    сервер просто принимает POST-запросы (удобно для локальной проверки
+    записанными апдейтами).
+    """
+    if not WEBHOOK_SECRET:
+        raise ValueError("WEBHOOK_SECRET is not set")
+
+    server = WebhookServer(bot, dp, WEBHOOK_SECRET)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    logger.info("Webhook server on %s:%s%s", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH)
+
+    try:
+        if WEBHOOK_URL:
+            await bot.set_webhook(
+                WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()